@@ -6,8 +6,21 @@ pygame.init()
 # game sizes
 CAMERA_WIDTH = 800
 CAMERA_HEIGHT = 600
-CELL_WIDTH = 32
-CELL_HEIGHT = 32
+# the world is drawn at the art's native size, CELL_WIDTH x CELL_HEIGHT per tile
+CELL_WIDTH = 16
+CELL_HEIGHT = 16
+# integer upscale of the camera's view, higher draws fewer pixels and looks coarser
+RENDER_SCALE = 2
+# cells past the camera's edges whose actors are still drawn
+CAMERA_CULL_MARGIN = 1
+
+# SAVE FILES
+# slot n is saved to SAVE_FILE + "n"
+SAVE_FILE = "data/savedata/savegame"
+SAVE_SLOTS = 3
+SAVE_CODEC = "zlib"  # "zlib", "lzma" or "none"
+SAVE_ZLIB_LEVEL = 6
+AUTOSAVE_TURNS = 20
 
 # FPS LIMIT
 GAME_FPS = 60
@@ -19,6 +32,13 @@ MAP_MAX_NUM_ROOMS = 10
 # MAP_MIN_NUM_ROOMS = 10
 MAP_BORDER_WIDTH = 2
 MAP_NUM_LEVELS = 2
+MAP_DOOR_CHANCE = 50  # percent of tunnel openings that get a door
+
+# TILE KINDS
+TILE_WALL = 0
+TILE_FLOOR = 1
+TILE_DOOR_CLOSED = 2
+TILE_DOOR_OPEN = 3
 
 # ROOM LIMITATIONS
 ROOM_MAX_HEIGHT = 7
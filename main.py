@@ -1,15 +1,32 @@
 # third party modules
 import tcod
 import pygame
+import numpy
 import math
 import pickle
 import gzip
 import os
 import datetime
+import time
+import argparse
+import bisect
+import collections
+import threading
+import concurrent.futures
+import hashlib
+import struct
+import zlib
+import lzma
 
 # game files
 import constants
 
+try:
+    from pygame._sdl2 import video
+except ImportError:
+    # pygame without the SDL2 renderer API, only the software renderer works
+    video = None
+
 # Structs
 # .d88888b    dP                                dP
 # 88.    "'   88                                88
@@ -20,9 +37,79 @@ import constants
 
 
 class struc_Tile:
-    def __init__(self, block_path):
-        self.block_path = block_path
-        self.explored = False
+    """ View of a single cell of an obj_TileMap, so map[x][y].block_path keeps working. """
+    __slots__ = ("tile_map", "x", "y")
+
+    def __init__(self, tile_map, x, y):
+        self.tile_map = tile_map
+        self.x = x
+        self.y = y
+
+    @property
+    def block_path(self):
+        return not self.tile_map.walkable[self.x, self.y]
+
+    @block_path.setter
+    def block_path(self, value):
+        if value:
+            self.tile_map.set_tiles((self.x, self.y), constants.TILE_WALL)
+        else:
+            self.tile_map.set_tiles((self.x, self.y), constants.TILE_FLOOR)
+
+    @property
+    def explored(self):
+        return bool(self.tile_map.explored[self.x, self.y])
+
+    @explored.setter
+    def explored(self, value):
+        self.tile_map.explored[self.x, self.y] = value
+
+
+class struc_TileColumn:
+    """ Result of map[x], indexing it with y gives the struc_Tile at (x, y). """
+    __slots__ = ("tile_map", "x")
+
+    def __init__(self, tile_map, x):
+        self.tile_map = tile_map
+        self.x = x
+
+    def __getitem__(self, y):
+        return struc_Tile(self.tile_map, self.x, y)
+
+    def __len__(self):
+        return self.tile_map.height
+
+
+class struc_Sprite:
+    """ Handle to one image packed into an obj_SpriteAtlas page. """
+    __slots__ = ("atlas", "rect")
+
+    def __init__(self, atlas, rect):
+        self.atlas = atlas
+        self.rect = rect
+
+
+class struc_SaveSlot(collections.namedtuple(
+        "struc_SaveSlot", ["file_name", "version", "name", "depth", "turn_count", "timestamp"])):
+    """
+    What the header of a save file says about the game in it.
+
+    Saves of another format version only have file_name and version, the
+    rest is None.
+    """
+    __slots__ = ()
+
+
+class struc_DrawList(collections.namedtuple(
+        "struc_DrawList", ["camera_rect", "tile_map", "look", "sprites", "messages", "fps"])):
+    """
+    Everything one game frame shows, captured on the main thread.
+
+    look is the map layer's look array, sprites the blits of the actors in
+    view and messages the last lines of the message log. None of it is
+    changed afterwards, so a frame can be drawn while the game moves on.
+    """
+    __slots__ = ()
 
 
 class struc_Preferences:
@@ -44,6 +131,9 @@ class struc_Preferences:
 
 
 class obj_Actor:
+    # the actor_id last handed out
+    last_id = 0
+
     def __init__(self, x, y,
                  name_object,
                  animation_key,
@@ -57,21 +147,20 @@ class obj_Actor:
                  equipment=None,
                  stairs=None,
                  exitportal=None):
-        self.x = x  # Map Address
-        self.y = y  # Map Address
+        # the obj_ActorList this actor is standing in, kept told of moves
+        self.actor_list = None
+        # names the actor in the save journal
+        obj_Actor.last_id += 1
+        self.actor_id = obj_Actor.last_id
+        self._x = x  # Map Address
+        self._y = y  # Map Address
         self.name_object = name_object
         self.animation_key = animation_key
-        self.animation = ASSETS.animation_dict[self.animation_key]
         # time for entire animation in seconds
         self.animation_speed = animation_speed / 1.0
-        self.depth = depth
+        self._depth = depth
         self.state = state
 
-        # animation flicker speed
-        self.flicker_speed = self.animation_speed / len(self.animation)
-        self.flicker_timer = 0.0
-        self.sprite_image = 0
-
         self.creature = creature
         if self.creature:
             self.creature.owner = self
@@ -103,6 +192,50 @@ class obj_Actor:
         if self.exitportal:
             self.exitportal.owner = self
 
+    @property
+    def x(self):
+        return self._x
+
+    @x.setter
+    def x(self, value):
+        if self.actor_list:
+            self.actor_list.actor_moved(self, (self._x, self._y), (value, self._y))
+        self._x = value
+
+    @property
+    def y(self):
+        return self._y
+
+    @y.setter
+    def y(self, value):
+        if self.actor_list:
+            self.actor_list.actor_moved(self, (self._x, self._y), (self._x, value))
+        self._y = value
+
+    @property
+    def depth(self):
+        return self._depth
+
+    @depth.setter
+    def depth(self, value):
+        if self.actor_list:
+            self.actor_list.render_remove(self)
+            self._depth = value
+            self.actor_list.render_add(self)
+            self.changed()
+        else:
+            self._depth = value
+
+    def changed(self):
+        """ Marks the actor for the next entry of the save journal. """
+        if self.actor_list:
+            self.actor_list.dirty.add(self)
+
+    @property
+    def animation(self):
+        """ The frames of animation_key, looked up in ASSETS when they are drawn. """
+        return ASSETS.animation_dict[self.animation_key]
+
     @property
     def display_name(self):
         # if self == PLAYER:
@@ -115,28 +248,14 @@ class obj_Actor:
             else:
                 return (self.name_object)
 
-    def draw(self):
+    def draw(self, batch):
+        """ Adds the blit of the current frame to batch, to be drawn with Surface.blits. """
         is_visible = tcod.map_is_in_fov(FOV_MAP, self.x, self.y)
         if is_visible:
-            if len(self.animation) == 1:
-                SURFACE_MAP.blit(
-                    self.animation[0], (self.x*constants.CELL_WIDTH, self.y * constants.CELL_HEIGHT))
-
-            elif len(self.animation) > 1:
-
-                if CLOCK.get_fps() > 0.0:
-                    self.flicker_timer += 1/CLOCK.get_fps()
-
-                if self.flicker_timer >= self.flicker_speed:
-                    self.flicker_timer = 0.0
-
-                    if self.sprite_image >= len(self.animation) - 1:
-                        self.sprite_image = 0
-                    else:
-                        self.sprite_image += 1
-
-                SURFACE_MAP.blit(self.animation[self.sprite_image], (
-                    self.x*constants.CELL_WIDTH, self.y * constants.CELL_HEIGHT))
+            sprite = ANIMATION_CLOCK.frame(self.animation, self.animation_speed)
+            batch.append((sprite.atlas,
+                          (self.x*constants.CELL_WIDTH, self.y * constants.CELL_HEIGHT),
+                          sprite.rect))
 
     def distance_to(self, other):
         dx = other.x - self.x
@@ -166,28 +285,28 @@ class obj_Actor:
 
         self.creature.move(dx, dy)
 
-    def animation_destroy(self):
-        self.animation = None
-
-    def animation_init(self):
-        self.animation = ASSETS.animation_dict[self.animation_key]
-
 
 class obj_Game:
-    def __init__(self):
-        self.current_map, self.current_rooms = map_create()
-        self.current_objects = []
+    def __init__(self, current_map=None, current_rooms=None, current_objects=None):
+        # a new game starts on a new level
+        if current_map is None:
+            current_map, current_rooms = map_create()
+            current_objects = obj_ActorList()
+
+        self.current_map, self.current_rooms = current_map, current_rooms
+        self.current_objects = current_objects
         self.message_history = []
         self.maps_previous = []
         self.maps_next = []
+        self.turn_count = 0
 
     def transition_next(self):
         global FOV_CALCULATE
 
         FOV_CALCULATE = True
 
-        for obj in self.current_objects:
-            obj.animation_destroy()
+        # the PLAYER travels with the game, not with the level
+        self.current_objects.remove(PLAYER)
 
         self.maps_previous.append(
             ((PLAYER.x, PLAYER.y),
@@ -197,9 +316,7 @@ class obj_Game:
 
         if len(self.maps_next) == 0:
 
-            self.current_objects = [PLAYER]
-
-            PLAYER.animation_init()
+            self.current_objects = obj_ActorList([PLAYER])
 
             self.current_map, self.current_rooms = map_create()
             map_place_objects(self.current_rooms)
@@ -207,8 +324,7 @@ class obj_Game:
             ((PLAYER.x, PLAYER.y), self.current_map, self.current_rooms,
                 self.current_objects) = self.maps_next[-1]
 
-            for obj in self.current_objects:
-                obj.animation_init()
+            self.current_objects.append(PLAYER)
 
             map_make_fov(self.current_map)
 
@@ -221,8 +337,7 @@ class obj_Game:
         global FOV_CALCULATE
         if len(self.maps_previous) != 0:
 
-            for obj in self.current_objects:
-                obj.animation_destroy()
+            self.current_objects.remove(PLAYER)
 
             self.maps_next.append(
                 ((PLAYER.x, PLAYER.y),
@@ -234,8 +349,7 @@ class obj_Game:
             ((PLAYER.x, PLAYER.y), self.current_map, self.current_rooms,
                 self.current_objects) = self.maps_previous[-1]
 
-            for obj in self.current_objects:
-                obj.animation_init()
+            self.current_objects.append(PLAYER)
 
             map_make_fov(self.current_map)
 
@@ -246,14 +360,338 @@ class obj_Game:
             game_message("There is no way to ascend. ")
 
 
+class obj_ActorList:
+    """
+    The objects of one level, with a spatial hash from map cell to the actors on it.
+
+    Iterates, appends and removes like the list it replaces. Actors report
+    their own moves through their x and y setters, so at() is a dict lookup.
+
+    render_list holds the same actors ordered by depth, deepest first, and is
+    kept ordered as actors come, go or change depth, so drawing never sorts.
+    in_region() looks up the actors of a few cells in the spatial hash and
+    puts just those in the same order.
+
+    dirty and removed collect the actors that changed and the actor_ids that
+    left since obj_AutoSave last journaled the level. list_order numbers the
+    actors in list order, so a few of them can be put in that order without
+    searching the list.
+    """
+
+    def __init__(self, actors=()):
+        self.actors = []
+        self.cells = {}
+        self.render_list = []
+        # -depth of every actor in render_list, for bisect
+        self.render_keys = []
+        # when each actor joined render_list, orders actors of equal depth
+        self.render_order = {}
+        self.render_count = 0
+        self.dirty = set()
+        self.removed = []
+        self.list_order = {}
+        self.list_count = 0
+
+        for actor in actors:
+            self.append(actor)
+
+    def __iter__(self):
+        return iter(self.actors)
+
+    def __len__(self):
+        return len(self.actors)
+
+    def __contains__(self, actor):
+        return actor in self.actors
+
+    def __getitem__(self, index):
+        return self.actors[index]
+
+    def append(self, actor):
+        self.actors.append(actor)
+        self.list_order[actor] = self.list_count
+        self.list_count += 1
+        self.cell_add(actor, (actor.x, actor.y))
+        self.render_add(actor)
+        actor.actor_list = self
+        self.dirty.add(actor)
+
+    def remove(self, actor):
+        self.actors.remove(actor)
+        del self.list_order[actor]
+        self.cell_remove(actor, (actor.x, actor.y))
+        self.render_remove(actor)
+        actor.actor_list = None
+        self.removed.append(actor.actor_id)
+
+    def replace(self, old_actor, new_actor):
+        """ Puts new_actor where old_actor stands in the list. """
+        index = self.actors.index(old_actor)
+        order = self.list_order[old_actor]
+        self.remove(old_actor)
+        self.append(new_actor)
+        self.actors.insert(index, self.actors.pop())
+        self.list_order[new_actor] = order
+
+    def at(self, x, y):
+        """ Actors on map cell (x, y), in the order they arrived there. """
+        return self.cells.get((x, y), ())
+
+    def in_region(self, x, y, width, height):
+        """ Actors on the cells of the region, in render_list order. """
+        actors = []
+
+        for cell_x in range(x, x + width):
+            for cell_y in range(y, y + height):
+                cell = self.cells.get((cell_x, cell_y))
+                if cell:
+                    actors.extend(cell)
+
+        # only the few actors in view are ordered, never the whole level
+        actors.sort(key=self.render_key)
+
+        return actors
+
+    def render_key(self, actor):
+        return (-actor.depth, self.render_order[actor])
+
+    def actor_moved(self, actor, old_coords, new_coords):
+        self.cell_remove(actor, old_coords)
+        self.cell_add(actor, new_coords)
+        self.dirty.add(actor)
+
+    def cell_add(self, actor, coords):
+        cell = self.cells.get(coords)
+        if cell is None:
+            self.cells[coords] = [actor]
+        else:
+            cell.append(actor)
+
+    def cell_remove(self, actor, coords):
+        cell = self.cells[coords]
+        cell.remove(actor)
+        if not cell:
+            del self.cells[coords]
+
+    def render_add(self, actor):
+        # after any actors of equal depth, like a stable sort of the list would.
+        index = bisect.bisect_right(self.render_keys, -actor.depth)
+        self.render_keys.insert(index, -actor.depth)
+        self.render_list.insert(index, actor)
+
+        self.render_order[actor] = self.render_count
+        self.render_count += 1
+
+    def render_remove(self, actor):
+        start = bisect.bisect_left(self.render_keys, -actor.depth)
+        stop = bisect.bisect_right(self.render_keys, -actor.depth)
+        index = self.render_list.index(actor, start, stop)
+        del self.render_keys[index]
+        del self.render_list[index]
+        del self.render_order[actor]
+
+
+class obj_TileMap:
+    """
+    Tile grid stored as one NumPy array per property, indexed [x, y].
+
+    kind : constants.TILE_* of every cell.
+    walkable, transparent : derived from kind, kept in sync by set_tiles.
+    explored : cells the PLAYER has seen.
+
+    kind_changed and explored_changed collect the flat indices of the cells
+    map_set_tile and map_calculate_fov changed since obj_AutoSave last
+    journaled the level.
+    """
+
+    # indexed by tile kind: wall, floor, closed door, open door
+    KIND_WALKABLE = numpy.array([False, True, False, True])
+    KIND_TRANSPARENT = numpy.array([False, True, False, True])
+
+    def __init__(self, width, height, kind=constants.TILE_WALL):
+        self.width = width
+        self.height = height
+
+        self.kind = numpy.full((width, height), kind, dtype=numpy.uint8)
+        self.walkable = self.KIND_WALKABLE[self.kind]
+        self.transparent = self.KIND_TRANSPARENT[self.kind]
+        self.explored = numpy.zeros((width, height), dtype=bool)
+
+        self.kind_changed = set()
+        # arrays of flat indices
+        self.explored_changed = []
+
+    def __getitem__(self, x):
+        return struc_TileColumn(self, x)
+
+    def __len__(self):
+        return self.width
+
+    def set_tiles(self, index, kind):
+        """ index is anything NumPy accepts on an [x, y] array, a single cell or slices. """
+        self.kind[index] = kind
+        self.walkable[index] = self.KIND_WALKABLE[kind]
+        self.transparent[index] = self.KIND_TRANSPARENT[kind]
+
+
+class obj_MapLayer:
+    """
+    The map tiles around the camera pre-rendered onto one surface.
+
+    The surface holds a window of cells one cell larger than the camera's view
+    on every side, with its top left cell at origin. When the camera moves the
+    window scrolls along and only the cells it uncovers are drawn, so the
+    surface stays the same size whatever the size of the map.
+
+    drawn remembers the look each cell of the window was last drawn with, so
+    after an FOV computation or a terrain change only the cells whose look
+    changed are redrawn. Looks are 0 for unseen, then kind * 2 + 1 explored and
+    kind * 2 + 2 visible.
+
+    look() runs on the main thread, update() wherever frames are drawn.
+    """
+
+    # look of the window cells that hold nothing yet
+    NOT_DRAWN = 255
+
+    def __init__(self):
+        self.width = constants.CAMERA_WIDTH // constants.RENDER_SCALE // constants.CELL_WIDTH + 2
+        self.height = constants.CAMERA_HEIGHT // constants.RENDER_SCALE // constants.CELL_HEIGHT + 2
+
+        self.surface = pygame.Surface((self.width*constants.CELL_WIDTH,
+                                       self.height*constants.CELL_HEIGHT))
+        self.origin = None
+        self.tile_map = None
+        self.drawn = numpy.full((self.width, self.height), self.NOT_DRAWN, dtype=numpy.uint8)
+        # the look array drawn last, to skip updates when nothing changed
+        self.drawn_look = None
+        # the map and look array last handed out by look()
+        self.look_map = None
+        self.current_look = None
+        self.dirty = True
+        # pixels redrawn since a renderer last uploaded the surface, None if none
+        self.redrawn_rect = None
+
+        # sprites for each look, in drawing order
+        self.look_sprites = {
+            constants.TILE_WALL * 2 + 1: [ASSETS.S_WALLEXPLORED[0]],
+            constants.TILE_WALL * 2 + 2: [ASSETS.S_WALL[0]],
+            constants.TILE_FLOOR * 2 + 1: [ASSETS.S_FLOOREXPLORED[0]],
+            constants.TILE_FLOOR * 2 + 2: [ASSETS.S_FLOOR[0]],
+            constants.TILE_DOOR_CLOSED * 2 + 1: [ASSETS.S_FLOOREXPLORED[0], ASSETS.S_DOOR_CLOSED[0]],
+            constants.TILE_DOOR_CLOSED * 2 + 2: [ASSETS.S_FLOOR[0], ASSETS.S_DOOR_CLOSED[0]],
+            constants.TILE_DOOR_OPEN * 2 + 1: [ASSETS.S_FLOOREXPLORED[0], ASSETS.S_DOOR_OPEN[0]],
+            constants.TILE_DOOR_OPEN * 2 + 2: [ASSETS.S_FLOOR[0], ASSETS.S_DOOR_OPEN[0]]
+        }
+
+    def look(self, tile_map):
+        """ The look of every cell of tile_map, only recomputed when marked dirty. """
+        if tile_map is not self.look_map or self.dirty:
+            self.dirty = False
+
+            # tcod stores its map [y, x]
+            visible = FOV_MAP.fov.T
+            base_look = tile_map.kind.astype(numpy.uint8) * 2
+
+            # a new array every time, a frame being drawn may still hold the old one
+            self.current_look = numpy.where(
+                visible, base_look + 2,
+                numpy.where(tile_map.explored, base_look + 1, 0)).astype(numpy.uint8)
+            self.look_map = tile_map
+
+        return self.current_look
+
+    def update(self, tile_map, look, camera_rect):
+        """ Moves the window to camera_rect and redraws the cells whose look changed. """
+        origin = (camera_rect.x // constants.CELL_WIDTH, camera_rect.y // constants.CELL_HEIGHT)
+
+        if tile_map is not self.tile_map:
+            # new level, start over
+            self.tile_map = tile_map
+            self.origin = origin
+            self.drawn[:] = self.NOT_DRAWN
+        elif origin != self.origin:
+            self.scroll(origin)
+        elif look is self.drawn_look:
+            return
+
+        # cells of the window past the map edges stay unseen
+        origin_x, origin_y = origin
+        window_look = numpy.zeros((self.width, self.height), dtype=numpy.uint8)
+
+        min_x, min_y = max(origin_x, 0), max(origin_y, 0)
+        max_x = min(origin_x + self.width, tile_map.width)
+        max_y = min(origin_y + self.height, tile_map.height)
+
+        if min_x < max_x and min_y < max_y:
+            window_look[min_x - origin_x:max_x - origin_x,
+                        min_y - origin_y:max_y - origin_y] = look[min_x:max_x, min_y:max_y]
+
+        changed = numpy.argwhere(window_look != self.drawn)
+
+        batch = []
+        for x, y in changed:
+            self.draw_tile(int(x), int(y), window_look[x, y], batch)
+
+        self.surface.blits(batch, doreturn=False)
+
+        if len(changed):
+            (min_x, min_y), (max_x, max_y) = changed.min(axis=0), changed.max(axis=0)
+            changed_rect = pygame.Rect(int(min_x) * constants.CELL_WIDTH,
+                                       int(min_y) * constants.CELL_HEIGHT,
+                                       int(max_x - min_x + 1) * constants.CELL_WIDTH,
+                                       int(max_y - min_y + 1) * constants.CELL_HEIGHT)
+
+            if self.redrawn_rect:
+                self.redrawn_rect = self.redrawn_rect.union(changed_rect)
+            else:
+                self.redrawn_rect = changed_rect
+
+        self.drawn = window_look
+        self.drawn_look = look
+
+    def scroll(self, origin):
+        """ Moves the window's top left cell to origin, keeping the cells still in it. """
+        d_x, d_y = origin[0] - self.origin[0], origin[1] - self.origin[1]
+        self.origin = origin
+
+        drawn = numpy.full((self.width, self.height), self.NOT_DRAWN, dtype=numpy.uint8)
+
+        if abs(d_x) < self.width and abs(d_y) < self.height:
+            self.surface.scroll(-d_x * constants.CELL_WIDTH, -d_y * constants.CELL_HEIGHT)
+
+            drawn[max(-d_x, 0):self.width - max(d_x, 0),
+                  max(-d_y, 0):self.height - max(d_y, 0)] = \
+                self.drawn[max(d_x, 0):self.width - max(-d_x, 0),
+                           max(d_y, 0):self.height - max(-d_y, 0)]
+
+        self.drawn = drawn
+        # everything moved
+        self.redrawn_rect = self.surface.get_rect()
+
+    def draw_tile(self, x, y, look, batch):
+        """ Clears the window cell x, y and adds its sprites to batch. """
+        tile_rect = pygame.Rect(x * constants.CELL_WIDTH, y * constants.CELL_HEIGHT,
+                                constants.CELL_WIDTH, constants.CELL_HEIGHT)
+
+        # sprites are colorkeyed, clear what was there before.
+        self.surface.fill(constants.COLOR_BLACK, tile_rect)
+
+        if look:
+            for sprite in self.look_sprites[look]:
+                batch.append((sprite.atlas, tile_rect.topleft, sprite.rect))
+
+
 class obj_Spritesheet:
     """ Class used to grab images out of a sprite sheet.
     "data/aquaticCreatures.png"
+    The images are packed into sprite_atlas and handed out as struc_Sprite handles.
     """
 
-    def __init__(self, file_name):
-        # load in sprite sheet.
-        self.sprite_sheet = pygame.image.load(file_name).convert()
+    def __init__(self, image, sprite_atlas):
+        # decoded sprite sheet.
+        self.sprite_sheet = image.convert()
+        self.sprite_atlas = sprite_atlas
         self.tiledict = {'a': 1, 'b': 2, 'c': 3, 'd': 4,
                          'e': 5, 'f': 6, 'g': 7, 'h': 8,
                          'i': 9, 'j': 10, 'k': 11, 'l': 12,
@@ -268,13 +706,12 @@ class obj_Spritesheet:
 
         image.blit(self.sprite_sheet, (0, 0),
                    (self.tiledict[column]*width, row*height, width, height))
-        image.set_colorkey(constants.COLOR_BLACK)
 
         if T_scale:
             (new_w, new_h) = T_scale
             image = pygame.transform.scale(image, (new_w, new_h))
 
-        image_list.append(image)
+        image_list.append(self.sprite_atlas.add(image))
 
         return image_list
 
@@ -291,18 +728,311 @@ class obj_Spritesheet:
             image.blit(self.sprite_sheet, (0, 0), ((
                 self.tiledict[column] + i)*width, row*height, width, height))
 
-            # Set transparency key to blank
-            image.set_colorkey(constants.COLOR_BLACK)
-
             if T_scale:
                 (new_w, new_h) = T_scale
                 image = pygame.transform.scale(image, (new_w, new_h))
 
-            image_list.append(image)
+            image_list.append(self.sprite_atlas.add(image))
 
         return image_list
 
 
+class obj_SpriteAtlas:
+    """
+    Packs sprites onto a few large colorkeyed pages.
+
+    Images are placed left to right on shelves as tall as the tallest image
+    on them, a new page is started when a page is full. Drawing a sprite is
+    a blit of its rect from its page, so a frame's sprites can go through a
+    single Surface.blits call.
+    """
+
+    PAGE_SIZE = 512
+
+    def __init__(self):
+        self.pages = []
+        # bumped whenever a page changes
+        self.version = 0
+        # top and height of the open shelf, x of the next image on it
+        self.shelf_y = 0
+        self.shelf_height = 0
+        self.shelf_x = 0
+
+    def add(self, image):
+        """ Copies image onto a page and returns its struc_Sprite. """
+        width, height = image.get_size()
+
+        if self.shelf_x + width > self.PAGE_SIZE:
+            # next shelf
+            self.shelf_y += self.shelf_height
+            self.shelf_height = 0
+            self.shelf_x = 0
+
+        if not self.pages or self.shelf_y + height > self.PAGE_SIZE:
+            self.page_new(max(width, height))
+
+        page = self.pages[-1]
+        rect = pygame.Rect(self.shelf_x, self.shelf_y, width, height)
+
+        # black is the transparent color of the sheets and the page background
+        page.blit(image, rect)
+
+        self.shelf_x += width
+        self.shelf_height = max(self.shelf_height, height)
+        self.version += 1
+
+        return struc_Sprite(page, rect)
+
+    def page_new(self, min_size):
+        size = max(self.PAGE_SIZE, min_size)
+        page = pygame.Surface((size, size)).convert()
+        page.fill(constants.COLOR_BLACK)
+        page.set_colorkey(constants.COLOR_BLACK)
+
+        self.pages.append(page)
+        self.shelf_y = 0
+        self.shelf_height = 0
+        self.shelf_x = 0
+
+
+class obj_GlyphAtlas:
+    """
+    The printable ASCII glyphs of one font, rasterized once onto one surface.
+
+    Strings are laid out from font.size of their prefixes, which includes the
+    font's kerning, and each string's layout is cached. Colors are tinted
+    copies of the white atlas, so drawing text never calls font.render.
+    Text with glyphs the atlas lacks is handed to font.render.
+    """
+
+    MAX_LAYOUTS = 512
+
+    def __init__(self, font):
+        self.font = font
+        self.height = font.get_height()
+
+        glyphs = {}
+        for code in range(32, 127):
+            glyph = font.render(chr(code), False, constants.COLOR_WHITE)
+            # glyphs taller than the font move the whole line, font.render handles those.
+            if glyph.get_height() == self.height:
+                glyphs[chr(code)] = glyph
+
+        self.surface = pygame.Surface(
+            (sum(glyph.get_width() for glyph in glyphs.values()), self.height),
+            pygame.SRCALPHA).convert_alpha()
+
+        self.glyph_rects = {}
+        atlas_x = 0
+        for char, glyph in glyphs.items():
+            self.surface.blit(glyph, (atlas_x, 0))
+            self.glyph_rects[char] = pygame.Rect(
+                atlas_x, 0, glyph.get_width(), self.height)
+            atlas_x += glyph.get_width()
+
+        self.tints = {}
+        self.layouts = {}
+
+    def layout(self, text):
+        """ Returns (x of every glyph, or None if the atlas can't draw text, (width, height)). """
+        text_layout = self.layouts.get(text)
+
+        if text_layout is None:
+            if all(char in self.glyph_rects for char in text):
+                glyph_x = [self.font.size(text[:i + 1])[0] - self.glyph_rects[char].width
+                           for i, char in enumerate(text)]
+            else:
+                glyph_x = None
+
+            if len(self.layouts) >= self.MAX_LAYOUTS:
+                self.layouts.clear()
+
+            text_layout = (glyph_x, self.font.size(text))
+            self.layouts[text] = text_layout
+
+        return text_layout
+
+    def size(self, text):
+        return self.layout(text)[1]
+
+    def tint(self, color):
+        tinted = self.tints.get(tuple(color))
+
+        if tinted is None:
+            tinted = self.surface.copy()
+            tinted.fill(pygame.Color(*color), special_flags=pygame.BLEND_RGBA_MULT)
+            self.tints[tuple(color)] = tinted
+
+        return tinted
+
+    def draw(self, surface, text, T_coords, color, back_color=None):
+        glyph_x, text_size = self.layout(text)
+        text_x, text_y = T_coords
+
+        if back_color:
+            surface.fill(back_color, pygame.Rect(T_coords, text_size))
+
+        if glyph_x is None:
+            surface.blit(self.font.render(text, False, color), T_coords)
+            return
+
+        tinted = self.tint(color)
+        surface.blits([(tinted, (text_x + x, text_y), self.glyph_rects[char])
+                       for char, x in zip(text, glyph_x)],
+                      doreturn=False)
+
+
+class obj_Hud:
+    """
+    The message log and the FPS counter, kept composed on their own surfaces.
+
+    They are only redrawn when a message arrives or the shown FPS changes,
+    on every other frame the HUD costs two blits.
+    """
+
+    def __init__(self):
+        self.text_height = helper_text_height(constants.FONT_MESSAGE_TEXT)
+
+        self.messages_y = (constants.CAMERA_HEIGHT -
+                           (constants.NUM_MESSAGES * self.text_height))
+        self.messages_surface = pygame.Surface(
+            (constants.CAMERA_WIDTH, constants.NUM_MESSAGES * self.text_height),
+            pygame.SRCALPHA).convert_alpha()
+        self.messages = None
+
+        self.fps = None
+        self.fps_surface = None
+
+    def draw_messages(self, surface, messages):
+        """ messages is a tuple of the (message, color) lines to show. """
+        if messages != self.messages:
+            self.messages = messages
+            self.compose_messages()
+
+        surface.blit(self.messages_surface, (0, self.messages_y))
+
+    def compose_messages(self):
+        self.messages_surface.fill((0, 0, 0, 0))
+
+        for i, (message, color) in enumerate(self.messages):
+            draw_text(self.messages_surface,
+                      message,
+                      (0, i * self.text_height),
+                      constants.FONT_MESSAGE_TEXT,
+                      color,
+                      constants.COLOR_BLACK)
+
+    def draw_debug(self, surface, fps):
+        if fps != self.fps:
+            self.fps = fps
+            fps_text = "FPS: " + str(fps)
+
+            self.fps_surface = pygame.Surface(
+                helper_glyph_atlas(constants.FONT_DEBUG_MESSAGE).size(fps_text))
+            draw_text(self.fps_surface, fps_text, (0, 0),
+                      constants.FONT_DEBUG_MESSAGE, constants.COLOR_WHITE, constants.COLOR_BLACK)
+
+        surface.blit(self.fps_surface, (0, 0))
+
+
+class obj_AnimationClock:
+    """
+    One clock for every animation.
+
+    The frame an actor shows is worked out from the time of the frame being
+    drawn, so animations with the same speed stay in step.
+    """
+
+    def __init__(self):
+        # seconds, the same for every actor drawn in a frame
+        self.time = 0.0
+
+    def update(self):
+        self.time = pygame.time.get_ticks() / 1000.0
+
+    def frame(self, animation, animation_speed):
+        """ The surface of animation to show now, animation_speed is the seconds for all of it. """
+        count = len(animation)
+        if count == 1:
+            return animation[0]
+
+        return animation[int(self.time * count / animation_speed) % count]
+
+    def next_frame(self, animation, animation_speed):
+        """ Clock time in seconds when animation changes frame, None if it has one frame. """
+        count = len(animation)
+        if count == 1:
+            return None
+
+        frame_length = animation_speed / count
+
+        return (math.floor(self.time / frame_length) + 1) * frame_length
+
+
+class obj_RenderScheduler:
+    """
+    Decides when the turn-based main loop has to draw.
+
+    A frame is drawn when input may have changed the game, when an
+    animation frame is due or while the camera is still easing.
+    Otherwise wait() blocks on the event queue, where a render thread posts
+    FRAME_READY when it finished a frame.
+    """
+
+    def __init__(self):
+        self.redraw = True
+        # pygame.time.get_ticks() of the next animation frame, None if nothing animates
+        self.next_animation = None
+        # whether the last wait() ended with input to handle
+        self.input_pending = False
+
+    def request_redraw(self):
+        self.redraw = True
+
+    def frame_due(self):
+        return (self.redraw or
+                CAMERA.moving or
+                (self.next_animation is not None and
+                 pygame.time.get_ticks() >= self.next_animation))
+
+    def wait(self):
+        """
+        Blocks until input arrives, the next frame is due or a render thread
+        finished one, input marks the game for redraw.
+        """
+        # nothing in the game loop looks at mouse motion
+        pygame.event.clear(pygame.MOUSEMOTION)
+
+        if not self.frame_due() and not pygame.event.peek():
+            if self.next_animation is None:
+                # 0 waits for as long as it takes
+                timeout = 0
+            else:
+                timeout = max(1, self.next_animation - pygame.time.get_ticks())
+
+            event = pygame.event.wait(timeout)
+
+            if event.type not in (pygame.NOEVENT, pygame.MOUSEMOTION, obj_RenderThread.FRAME_READY):
+                # put it back for game_handle_keys
+                pygame.event.post(event)
+
+        # the finished frame is presented all the same, it isn't input
+        pygame.event.clear(obj_RenderThread.FRAME_READY)
+
+        self.input_pending = pygame.event.peek()
+        if self.input_pending:
+            self.request_redraw()
+
+    def frame_drawn(self):
+        self.redraw = False
+
+        next_frame = draw_next_animation_frame()
+        if next_frame is None:
+            self.next_animation = None
+        else:
+            self.next_animation = int(math.ceil(next_frame * 1000))
+
+
 class obj_Room:
     """
     This is a rectangle that lives on the map
@@ -330,15 +1060,17 @@ class obj_Room:
 
 class obj_Camera:
     def __init__(self, follow_speed=0.1):
+        # position and size in world pixels, the view is scaled up to the window
         self.x, self.y = (0, 0)
-        self.width = constants.CAMERA_WIDTH
-        self.height = constants.CAMERA_HEIGHT
+        self.width = constants.CAMERA_WIDTH // constants.RENDER_SCALE
+        self.height = constants.CAMERA_HEIGHT // constants.RENDER_SCALE
         self.follow_speed = follow_speed
+        # whether the last update still moved the camera
+        self.moving = True
 
     @property
     def rect(self):
-        pos_rect = pygame.Rect((0, 0),
-                               (constants.CAMERA_WIDTH, constants.CAMERA_HEIGHT))
+        pos_rect = pygame.Rect((0, 0), (self.width, self.height))
 
         pos_rect.center = (self.x, self.y)
 
@@ -360,8 +1092,13 @@ class obj_Camera:
 
         distance_x, distance_y = self.map_dist((target_x, target_y))
 
-        self.x += int(distance_x * self.follow_speed)
-        self.y += int(distance_y * self.follow_speed)
+        step_x = int(distance_x * self.follow_speed)
+        step_y = int(distance_y * self.follow_speed)
+
+        self.x += step_x
+        self.y += step_y
+
+        self.moving = (step_x != 0 or step_y != 0)
 
     def win_to_map(self, T_coords):
 
@@ -385,120 +1122,517 @@ class obj_Camera:
 
     def cam_dist(self, T_coords):
         win_x, win_y = T_coords
-        dist_x = int(win_x - (self.width/2))
-        dist_y = int(win_y - (self.height/2))
+        dist_x = int(win_x / constants.RENDER_SCALE - (self.width/2))
+        dist_y = int(win_y / constants.RENDER_SCALE - (self.height/2))
 
         return (dist_x, dist_y)
 
 
-class obj_Assets:
+class obj_SurfaceRenderer:
+    """
+    Draws with Surface blits. The camera's view of the world is composed on
+    world_surface, in camera space, and scaled up onto surface, the window's by
+    default.
+    """
+
+    def __init__(self, surface=None):
+        if surface is None:
+            surface = pygame.display.set_mode(
+                (constants.CAMERA_WIDTH, constants.CAMERA_HEIGHT)
+                # pygame.HWSURFACE | pygame.RESIZABLE
+            )
+
+        self.surface = surface
+        self.world_surface = pygame.Surface((constants.CAMERA_WIDTH // constants.RENDER_SCALE,
+                                             constants.CAMERA_HEIGHT // constants.RENDER_SCALE))
+        self.camera_rect = None
+
+    def clear(self, color):
+        self.surface.fill(color)
+
+    def draw_map_layer(self, map_layer, camera_rect):
+        self.camera_rect = camera_rect
+
+        # the map layer covers the whole view, nothing to clear
+        origin_x, origin_y = map_layer.origin
+        self.world_surface.blit(map_layer.surface,
+                                (origin_x * constants.CELL_WIDTH - camera_rect.x,
+                                 origin_y * constants.CELL_HEIGHT - camera_rect.y))
+
+    def draw_sprites(self, batch):
+        camera_x, camera_y = self.camera_rect.topleft
+
+        self.world_surface.blits([(page, (x - camera_x, y - camera_y), rect)
+                                  for page, (x, y), rect in batch], doreturn=False)
+
+    def draw_view(self, camera_rect):
+        view_rect, screen_rect = helper_view_rects(camera_rect)
+
+        # past the map edges the window keeps its background
+        pygame.transform.scale(
+            self.world_surface.subsurface(view_rect.move(-camera_rect.x, -camera_rect.y)),
+            screen_rect.size, self.surface.subsurface(screen_rect))
+
+    def snapshot(self):
+        """ A copy of the frame drawn so far, for restore(). """
+        return self.surface.copy()
+
+    def restore(self, snapshot):
+        self.surface.blit(snapshot, (0, 0))
+
+    def present(self, rects=None):
+        """ Shows the frame, only rects of it if given. """
+        if rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+
+
+class obj_TextureRenderer:
+    """
+    Draws the world through SDL2's renderer. Atlas pages and the map layer are
+    uploaded as textures once and scaled up by the renderer while drawing.
+
+    Everything else (HUD, text, menus) still draws onto surface, which is
+    uploaded as a transparent overlay on present. World draws are kept until
+    the next clear, like the software renderer keeps its window surface.
+    Uses SDL's software renderer when there is no accelerated one.
+    """
+
+    # SDL_BLENDMODE_BLEND, pygame._sdl2.video doesn't export the blend modes
+    BLENDMODE_BLEND = 1
+
     def __init__(self):
-        self.load_assets()
-        self.volume_adjust()
+        # convert() needs a display surface, the game runs in its own SDL window
+        pygame.display.set_mode((1, 1), pygame.HIDDEN)
+
+        self.window = video.Window(size=(constants.CAMERA_WIDTH, constants.CAMERA_HEIGHT))
+
+        try:
+            self.renderer = video.Renderer(self.window, accelerated=1)
+        except RuntimeError:
+            self.renderer = video.Renderer(self.window, accelerated=0)
+
+        self.surface = pygame.Surface((constants.CAMERA_WIDTH, constants.CAMERA_HEIGHT),
+                                      pygame.SRCALPHA)
+        self.overlay = video.Texture(self.renderer, self.surface.get_size(), streaming=True)
+        self.overlay.blend_mode = self.BLENDMODE_BLEND
+
+        self.clear_color = constants.COLOR_BLACK
+        # (texture, source rect, window rect) drawn since the last clear
+        self.world = []
+
+        self.camera_rect = None
+        self.view_rect = None
+
+        self.map_surface = None
+        self.map_texture = None
+
+        # atlas page: texture, dropped when the atlas changes
+        self.page_textures = {}
+        self.atlas_version = None
+
+    def clear(self, color):
+        self.clear_color = color
+        self.world = []
+        self.surface.fill((0, 0, 0, 0))
+
+    def draw_map_layer(self, map_layer, camera_rect):
+        if map_layer.surface is not self.map_surface:
+            self.map_surface = map_layer.surface
+            self.map_texture = video.Texture(self.renderer, self.map_surface.get_size(),
+                                             streaming=True)
+            map_layer.redrawn_rect = self.map_surface.get_rect()
+
+        if map_layer.redrawn_rect:
+            # only the cells the map layer redrew since the last upload
+            self.map_texture.update(self.map_surface.subsurface(map_layer.redrawn_rect),
+                                    map_layer.redrawn_rect)
+            map_layer.redrawn_rect = None
+
+        self.camera_rect = camera_rect
+        self.view_rect = helper_view_rects(camera_rect)[0]
+
+        origin_x, origin_y = map_layer.origin
+        self.queue(self.map_texture, self.map_surface.get_rect(),
+                   (origin_x * constants.CELL_WIDTH, origin_y * constants.CELL_HEIGHT))
+
+    def draw_sprites(self, batch):
+        if self.atlas_version != ASSETS.sprite_atlas.version:
+            # sprites were packed since the pages were uploaded
+            self.page_textures = {}
+            self.atlas_version = ASSETS.sprite_atlas.version
+
+        for page, T_coords, rect in batch:
+            texture = self.page_textures.get(page)
+            if texture is None:
+                texture = video.Texture.from_surface(self.renderer, page)
+                self.page_textures[page] = texture
+
+            self.queue(texture, rect, T_coords)
+
+    def draw_view(self, camera_rect):
+        # the world was queued in window space already
+        pass
+
+    def queue(self, texture, area, T_coords):
+        """ Queues area of texture at world position T_coords, clipped to the camera's view. """
+        world_rect = pygame.Rect(T_coords, area.size)
+        clipped = world_rect.clip(self.view_rect)
+
+        if not clipped.width or not clipped.height:
+            return
+
+        source_rect = pygame.Rect(area.x + clipped.x - world_rect.x,
+                                  area.y + clipped.y - world_rect.y,
+                                  clipped.width, clipped.height)
+        window_rect = pygame.Rect((clipped.x - self.camera_rect.x) * constants.RENDER_SCALE,
+                                  (clipped.y - self.camera_rect.y) * constants.RENDER_SCALE,
+                                  clipped.width * constants.RENDER_SCALE,
+                                  clipped.height * constants.RENDER_SCALE)
+
+        self.world.append((texture, source_rect, window_rect))
+
+    def snapshot(self):
+        """ A copy of the overlay drawn so far, for restore(). The world stays queued until the next clear. """
+        snapshot = self.surface.copy()
+        # blit the pixels as they are, alpha and all
+        snapshot.set_alpha(None)
+        return snapshot
+
+    def restore(self, snapshot):
+        self.surface.blit(snapshot, (0, 0))
+
+    def present(self, rects=None):
+        """ Shows the frame, uploading only rects of the overlay if given. """
+        self.renderer.draw_color = pygame.Color(self.clear_color)
+        self.renderer.clear()
+
+        for texture, source_rect, window_rect in self.world:
+            texture.draw(source_rect, window_rect)
+
+        if rects is None:
+            self.overlay.update(self.surface)
+        else:
+            for rect in rects:
+                rect = rect.clip(self.surface.get_rect())
+                self.overlay.update(self.surface.subsurface(rect), rect)
+        self.overlay.draw()
 
-    def load_assets(self):
-        """ ART """
-        # SPRITESHEETS
-        self.reptiles = obj_Spritesheet("data/graphics/Characters/Reptile.png")
-        self.aquatic = obj_Spritesheet("data/graphics/Characters/Aquatic.png")
-        self.rodent = obj_Spritesheet("data/graphics/Characters/Rodent.png")
-        self.wall = obj_Spritesheet("data/graphics/Objects/Wall.png")
-        self.floor = obj_Spritesheet("data/graphics/Objects/Floor.png")
-        self.tile = obj_Spritesheet("data/graphics/Objects/Tile.png")
-        self.shield = obj_Spritesheet("data/graphics/Items/Shield.png")
-        self.medwep = obj_Spritesheet("data/graphics/Items/MedWep.png")
-        self.scroll = obj_Spritesheet("data/graphics/Items/Scroll.png")
-        self.flesh = obj_Spritesheet("data/graphics/Items/Flesh.png")
-        self.misc = obj_Spritesheet("data/graphics/Items/Light.png")
-        self.doors = obj_Spritesheet("data/graphics/Objects/Door.png")
+        self.renderer.present()
+
+
+class obj_RenderThread:
+    """
+    Draws game frames from struc_DrawLists on its own thread.
 
+    A new draw list replaces one that was not started yet. Frames are drawn
+    into the back buffer with an obj_SurfaceRenderer and swapped with the
+    front buffer, which present() copies to the window on the main thread.
+    A FRAME_READY event wakes the main thread when a frame is swapped in.
+
+    Sprites are packed onto the atlas pages on the main thread, under
+    RENDER_LOCK, so never while the thread blits from them.
+    """
+
+    FRAME_READY = pygame.event.custom_type()
+
+    def __init__(self):
+        size = (constants.CAMERA_WIDTH, constants.CAMERA_HEIGHT)
+
+        self.renderer = obj_SurfaceRenderer(pygame.Surface(size).convert())
+        self.front = pygame.Surface(size).convert()
+        self.frame_ready = False
+
+        self.draw_list = None
+        self.error = None
+        self.running = True
+
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, draw_list):
+        with self.condition:
+            self.draw_list = draw_list
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.draw_list is None and self.running:
+                    self.condition.wait()
+
+                if not self.running:
+                    return
+
+                draw_list = self.draw_list
+                self.draw_list = None
+
+            try:
+                with RENDER_LOCK:
+                    draw_compose(self.renderer, draw_list)
+            except Exception as error:
+                # raised again on the main thread by present()
+                self.error = error
+
+            with self.condition:
+                self.renderer.surface, self.front = self.front, self.renderer.surface
+                self.frame_ready = True
+
+            # after frame_ready is set, so the main thread can't miss the frame
+            pygame.event.post(pygame.event.Event(self.FRAME_READY))
+
+    def present(self):
+        """ Shows the newest finished frame. Returns False if there is none. """
+        if self.error:
+            raise self.error
+
+        with self.condition:
+            if not self.frame_ready:
+                return False
+
+            self.frame_ready = False
+            # the thread swaps buffers under the condition, so front stays put
+            SURFACE_MAIN.blit(self.front, (0, 0))
+
+        RENDERER.present()
+
+        return True
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+
+        self.thread.join()
+
+
+class obj_AnimationDict(dict):
+    """ animation_dict that builds an animation the first time its key is asked for. """
+
+    def __init__(self, assets):
+        super().__init__()
+        self.assets = assets
+
+    def __missing__(self, animation_key):
+        # a render thread may be drawing from the page the frames go on
+        with RENDER_LOCK:
+            animation = self.assets.sprite_build(animation_key)
+        self[animation_key] = animation
+        return animation
+
+
+class obj_Assets:
+    """
+    Sheets, images and sounds are decoded on a worker pool while a progress
+    callback runs on the main thread. Sprites are only sliced out of their
+    sheet the first time they are used, through animation_dict or as attributes.
+
+    The sliced and scaled pixels of every sprite are kept in CACHE_FILE, keyed
+    by the hash of their sheet and their slicing parameters. Sheets are only
+    decoded when a sprite of theirs is missing from the cache or out of date.
+    """
+
+    CACHE_FILE = "data/cache/sprites"
+    CACHE_VERSION = 1
+
+    # size of a sprite in its sheet, and once scaled
+    SPRITE_SIZE = (16, 16)
+    SPRITE_SCALE = (constants.CELL_WIDTH, constants.CELL_HEIGHT)
+
+    # SPRITESHEETS
+    SHEET_FILES = {
+        "reptiles": "data/graphics/Characters/Reptile.png",
+        "aquatic": "data/graphics/Characters/Aquatic.png",
+        "rodent": "data/graphics/Characters/Rodent.png",
+        "wall": "data/graphics/Objects/Wall.png",
+        "floor": "data/graphics/Objects/Floor.png",
+        "tile": "data/graphics/Objects/Tile.png",
+        "shield": "data/graphics/Items/Shield.png",
+        "medwep": "data/graphics/Items/MedWep.png",
+        "scroll": "data/graphics/Items/Scroll.png",
+        "flesh": "data/graphics/Items/Flesh.png",
+        "misc": "data/graphics/Items/Light.png",
+        "doors": "data/graphics/Objects/Door.png"
+    }
+
+    # sheet, column, row, number of frames. Every sprite is SPRITE_SIZE scaled to SPRITE_SCALE.
+    SPRITES = {
         # ANIMATIONS
-        self.A_PLAYER = self.reptiles.get_animation(
-            'm', 5, 16, 16, 2, (32, 32))
-        self.A_SNAKE_01 = self.reptiles.get_animation(
-            'e', 5, 16, 16, 2, (32, 32))
-        self.A_SNAKE_02 = self.reptiles.get_animation(
-            'k', 5, 16, 16, 2, (32, 32))
-        self.A_MOUSE = self.rodent.get_animation(
-            'a', 2, 16, 16, 2, (32, 32))
-        self.A_PLATINO = self.rodent.get_animation(
-            'g', 13, 16, 16, 2, (32, 32))
-
-        # SPRITES
-        self.S_WALL = self.wall.get_image('d', 7, 16, 16, (32, 32))[0]
-        self.S_WALLEXPLORED = self.wall.get_image('d', 13, 16, 16, (32, 32))[0]
-
-        self.S_FLOOR = self.floor.get_image('b', 8, 16, 16, (32, 32))[0]
-        self.S_FLOOREXPLORED = self.floor.get_image(
-            'b', 14, 16, 16, (32, 32))[0]
+        "A_PLAYER": ("reptiles", 'm', 5, 2),
+        "A_SNAKE_01": ("reptiles", 'e', 5, 2),
+        "A_SNAKE_02": ("reptiles", 'k', 5, 2),
+        "A_MOUSE": ("rodent", 'a', 2, 2),
+        "A_PLATINO": ("rodent", 'g', 13, 2),
+
+        # TILES
+        "S_WALL": ("wall", 'd', 7, 1),
+        "S_WALLEXPLORED": ("wall", 'd', 13, 1),
+        "S_FLOOR": ("floor", 'b', 8, 1),
+        "S_FLOOREXPLORED": ("floor", 'b', 14, 1),
+        "S_DOOR_CLOSED": ("doors", 'a', 1, 1),
+        "S_DOOR_OPEN": ("doors", 'c', 1, 1),
 
         # ITEMS
-        self.S_SWORD = self.medwep.get_image('a', 1, 16, 16, (32, 32))
-        self.S_SHIELD = self.shield.get_image('a', 1, 16, 16, (32, 32))
-        self.S_SCROLL_YELLOW = self.scroll.get_image('e', 1, 16, 16, (32, 32))
-        self.S_SCROLL_RED = self.scroll.get_image('c', 2, 16, 16, (32, 32))
-        self.S_SCROLL_BLANK = self.scroll.get_image('d', 6, 16, 16, (32, 32))
-        self.S_FLESH_01 = self.flesh.get_image('b', 4, 16, 16, (32, 32))
-        self.S_FLESH_02 = self.flesh.get_image('a', 1, 16, 16, (32, 32))
+        "S_SWORD": ("medwep", 'a', 1, 1),
+        "S_SHIELD": ("shield", 'a', 1, 1),
+        "S_SCROLL_YELLOW": ("scroll", 'e', 1, 1),
+        "S_SCROLL_RED": ("scroll", 'c', 2, 1),
+        "S_SCROLL_BLANK": ("scroll", 'd', 6, 1),
+        "S_SCROLL_BROWN": ("scroll", 'g', 1, 1),
+        "S_FLESH_01": ("flesh", 'b', 4, 1),
+        "S_FLESH_02": ("flesh", 'a', 1, 1),
 
         # SPECIAL
-        self.S_STAIRS_DOWN = self.tile.get_image('f', 4, 16, 16, (32, 32))
-        self.S_STAIRS_UP = self.tile.get_image('e', 4, 16, 16, (32, 32))
-        self.I_MAIN_MENU_BG = pygame.image.load(
-            "data/graphics/game/mainmenu.jpg")
-        self.I_MAIN_MENU_BG = pygame.transform.scale(self.I_MAIN_MENU_BG,
-                                                     (constants.CAMERA_WIDTH, constants.CAMERA_HEIGHT))
-        self.S_MAGIC_LAMP = self.misc.get_image('e', 1, 16, 16, (32, 32))
-        self.S_PORTAL_CLOSED = self.doors.get_image('j', 6, 16, 16, (32, 32))
-        self.A_PORTAL_OPEN = self.doors.get_animation(
-            'k', 6, 16, 16, 2, (32, 32))
-
-        self.animation_dict = {
-            # ANIMATIONS
-            "A_PLAYER": self.A_PLAYER,
-            "A_SNAKE_01": self.A_SNAKE_01,
-            "A_SNAKE_02": self.A_SNAKE_02,
-            "A_MOUSE": self.A_MOUSE,
-            "A_PLATINO": self.A_PLATINO,
-
-            # ITEMS
-            "S_SWORD": self.S_SWORD,
-            "S_SHIELD": self.S_SHIELD,
-            "S_SCROLL_YELLOW": self.S_SCROLL_YELLOW,
-            "S_SCROLL_RED": self.S_SCROLL_RED,
-            "S_SCROLL_BLANK": self.S_SCROLL_BLANK,
-            "S_FLESH_01": self.S_FLESH_01,
-            "S_FLESH_02": self.S_FLESH_02,
-
-            # SPECIAL
-            "S_STAIRS_DOWN": self.S_STAIRS_DOWN,
-            "S_STAIRS_UP": self.S_STAIRS_UP,
-            "S_MAGIC_LAMP": self.S_MAGIC_LAMP,
-            "S_PORTAL_CLOSED": self.S_PORTAL_CLOSED,
-            "A_PORTAL_OPEN": self.A_PORTAL_OPEN
-        }
+        "S_STAIRS_DOWN": ("tile", 'f', 4, 1),
+        "S_STAIRS_UP": ("tile", 'e', 4, 1),
+        "S_MAGIC_LAMP": ("misc", 'e', 1, 1),
+        "S_PORTAL_CLOSED": ("doors", 'j', 6, 1),
+        "A_PORTAL_OPEN": ("doors", 'k', 6, 2)
+    }
+
+    SOUND_FILES = [
+        "data/Audio/Hit_Hurt1.wav",
+        "data/Audio/Hit_Hurt2.wav",
+        "data/Audio/Hit_Hurt3.wav",
+        "data/Audio/Hit_Hurt4.wav"
+    ]
+
+    def __init__(self, progress=None):
+        # every sprite is packed onto the atlas pages
+        self.sprite_atlas = obj_SpriteAtlas()
+        self.animation_dict = obj_AnimationDict(self)
+
+        # decoded sheet images, turned into obj_Spritesheets when first used
+        self.sheet_images = {}
+        self.sheets = {}
+
+        # animation_key: (sprite_params, [frame pixels]) read from CACHE_FILE
+        self.sprite_cache = {}
+
+        self.load_assets(progress)
+        self.volume_adjust()
 
-        """ AUDIO """
+    def __getattr__(self, name):
+        # ASSETS.S_WALL and friends
+        if name in obj_Assets.SPRITES:
+            return self.animation_dict[name]
+
+        raise AttributeError(name)
+
+    def load_assets(self, progress=None):
+        """ Decodes every file on a worker pool, progress(done, total) is called as they finish. """
+        jobs = {}
+
+        self.sheet_hashes = {sheet_name: helper_file_hash(file_name)
+                             for sheet_name, file_name in self.SHEET_FILES.items()}
+
+        self.sprite_cache = self.cache_load()
+
+        stale_keys = [animation_key for animation_key in self.SPRITES
+                      if self.sprite_cache.get(animation_key, (None,))[0] !=
+                      self.sprite_params(animation_key)]
+
+        with concurrent.futures.ThreadPoolExecutor() as pool:
+            """ ART """
+            for sheet_name in {self.SPRITES[animation_key][0] for animation_key in stale_keys}:
+                jobs[pool.submit(pygame.image.load, self.SHEET_FILES[sheet_name])] = ("sheet", sheet_name)
+
+            jobs[pool.submit(pygame.image.load, "data/graphics/game/mainmenu.jpg")] = ("image", None)
+
+            """ AUDIO """
+            for index, file_name in enumerate(self.SOUND_FILES):
+                jobs[pool.submit(pygame.mixer.Sound, file_name)] = ("sound", index)
+
+            sounds = [None] * len(self.SOUND_FILES)
+
+            for done, future in enumerate(concurrent.futures.as_completed(jobs), 1):
+                kind, key = jobs[future]
+
+                if kind == "sheet":
+                    self.sheet_images[key] = future.result()
+                elif kind == "image":
+                    self.I_MAIN_MENU_BG = pygame.transform.scale(
+                        future.result(), (constants.CAMERA_WIDTH, constants.CAMERA_HEIGHT))
+                else:
+                    sounds[key] = future.result()
+
+                if progress:
+                    progress(done, len(jobs))
 
         # Audio
         self.music_background = "data/Audio/Boundless_Protest.mp3"
         # Sound
-        self.snd_list = []
-
-        self.snd_hit1 = self.sound_add("data/Audio/Hit_Hurt1.wav")
-        self.snd_hit2 = self.sound_add("data/Audio/Hit_Hurt2.wav")
-        self.snd_hit3 = self.sound_add("data/Audio/Hit_Hurt3.wav")
-        self.snd_hit4 = self.sound_add("data/Audio/Hit_Hurt4.wav")
-        self.snd_hit_list = [
-            self.snd_hit1,
-            self.snd_hit2,
-            self.snd_hit3,
-            self.snd_hit4]
-
-    def sound_add(self, file_address):
-        new_sound = pygame.mixer.Sound(file_address)
-        self.snd_list.append(new_sound)
-        return new_sound
+        self.snd_list = sounds
+        self.snd_hit_list = list(sounds)
+
+        if stale_keys:
+            # slice and scale once, later starts read the cache
+            for animation_key in stale_keys:
+                animation = self.sprite_slice(animation_key)
+                self.animation_dict[animation_key] = animation
+                self.sprite_cache[animation_key] = (
+                    self.sprite_params(animation_key),
+                    [pygame.image.tostring(sprite.atlas.subsurface(sprite.rect), "RGB")
+                     for sprite in animation])
+
+            self.cache_save()
+
+    def cache_load(self):
+        """ The sprites in CACHE_FILE, empty if there is no usable cache. """
+        try:
+            with open(self.CACHE_FILE, "rb") as file:
+                version, sprite_cache = pickle.load(file)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return {}
+
+        if version != self.CACHE_VERSION:
+            return {}
+
+        return sprite_cache
+
+    def cache_save(self):
+        os.makedirs(os.path.dirname(self.CACHE_FILE), exist_ok=True)
+
+        # never leave a half written cache behind
+        temp_file = self.CACHE_FILE + ".tmp"
+        with open(temp_file, "wb") as file:
+            pickle.dump((self.CACHE_VERSION, self.sprite_cache), file, pickle.HIGHEST_PROTOCOL)
+
+        os.replace(temp_file, self.CACHE_FILE)
+
+    def sprite_params(self, animation_key):
+        """ Everything the pixels of animation_key depend on. """
+        sheet_name = self.SPRITES[animation_key][0]
+
+        return (self.sheet_hashes[sheet_name], self.SPRITES[animation_key],
+                self.SPRITE_SIZE, self.SPRITE_SCALE)
+
+    def sheet(self, sheet_name):
+        """ The obj_Spritesheet of sheet_name, converted on first use. """
+        sheet = self.sheets.get(sheet_name)
+
+        if sheet is None:
+            sheet = obj_Spritesheet(self.sheet_images.pop(sheet_name), self.sprite_atlas)
+            self.sheets[sheet_name] = sheet
+
+        return sheet
+
+    def sprite_build(self, animation_key):
+        """ Packs the cached frames of animation_key. """
+        sprite_params, frames = self.sprite_cache[animation_key]
+
+        return [self.sprite_atlas.add(pygame.image.fromstring(frame, self.SPRITE_SCALE, "RGB"))
+                for frame in frames]
+
+    def sprite_slice(self, animation_key):
+        """ Slices, scales and packs the frames of animation_key from its sheet. """
+        sheet_name, column, row, num_sprites = self.SPRITES[animation_key]
+        width, height = self.SPRITE_SIZE
+
+        return self.sheet(sheet_name).get_animation(column, row, width, height,
+                                                    num_sprites, self.SPRITE_SCALE)
 
     def volume_adjust(self):
         for sound in self.snd_list:
@@ -506,6 +1640,590 @@ class obj_Assets:
         pygame.mixer.music.set_volume(PREFERENCES.vol_music)
 
 
+class obj_SaveFile:
+    """
+    The chunked, versioned binary save format.
+
+    A header (magic, format version, codec) and a slot header (character
+    name, depth, turn count, when it was saved) of fixed size are followed by
+    sections, each a tag, its size before and after compression, then its
+    compressed bytes. slot() reads the headers alone, for listing saves.
+    The GAME section holds the counters and the message log, then one LEVL
+    section per level in order: the levels above, the current one, the
+    levels below. A level is its tile layers as packed arrays followed by its
+    rooms and actors as records of plain values. Functions and AI classes are
+    stored by name and looked up in SAVE_FUNCTIONS and SAVE_AIS.
+
+    snapshot() copies a game out into those records and arrays, nothing in it
+    is shared with the live game, so write() can pack it on another thread.
+
+    The journal next to the file holds what changed since it was written, one
+    entry per change: the save_id of the snapshot it follows, the turn count,
+    the new lines of the message log, the records of the current level's
+    actors that changed, the actor_ids that left it and the tile cells that
+    changed. Each entry is framed by its size and CRC, a crash can only cut
+    the last one short. load() replays the entries that follow the file and
+    reports those that follow a newer snapshot that never reached the disk;
+    writing the file deletes the journal.
+    """
+
+    MAGIC = b"PYRLSAVE"
+    VERSION = 4
+    # magic, version, codec
+    HEADER = struct.Struct("<8sHB")
+    # character name, depth, turn count, unix time saved
+    SLOT = struct.Struct("<32sHIq")
+    # tag, raw size, stored size
+    SECTION = struct.Struct("<4sII")
+    # width, height, where the PLAYER stands or left it
+    LEVEL = struct.Struct("<HHhh")
+    # size, CRC-32 of a journal entry
+    ENTRY = struct.Struct("<II")
+    CODECS = ("none", "zlib", "lzma")
+
+    def __init__(self, file_name, codec=constants.SAVE_CODEC,
+                 zlib_level=constants.SAVE_ZLIB_LEVEL):
+        if codec not in self.CODECS:
+            raise ValueError("unknown save codec " + repr(codec))
+
+        self.file_name = file_name
+        self.journal_file = file_name + ".journal"
+        # the snapshot journal entries follow
+        self.save_id = None
+        self.codec = codec
+        self.zlib_level = zlib_level
+
+    def save(self, game, player):
+        self.write(self.snapshot(game, player))
+
+    def remove(self):
+        for file_name in (self.file_name, self.journal_file):
+            if os.path.exists(file_name):
+                os.remove(file_name)
+
+    def load(self):
+        """ The obj_Game and PLAYER stored in the file, with the journal replayed. """
+        sections = self.read()
+
+        tag, data = sections[0]
+        if tag != b"GAME":
+            raise ValueError("save file has no GAME section")
+
+        turn_count, message_history, num_previous, player_id, save_id = pickle.loads(data)
+
+        levels = [self.level_unpack(data) for tag, data in sections[1:] if tag == b"LEVL"]
+
+        T_coords, current_map, current_rooms, current_objects = levels[num_previous]
+
+        game = obj_Game(current_map, current_rooms, current_objects)
+        game.message_history = message_history
+        game.maps_previous = levels[:num_previous]
+        game.maps_next = levels[num_previous + 1:]
+        game.turn_count = turn_count
+
+        num_lost = 0
+        for entry in self.journal_read():
+            if entry[0] == save_id:
+                self.journal_apply(game, entry)
+            elif entry[0] > save_id:
+                # they follow a save that never reached the disk
+                num_lost += 1
+            # older ones are left by a crash between writing the file and
+            # deleting the journal, the file already holds them
+
+        if num_lost:
+            game.message_history.append(
+                (str(num_lost) + " autosaved changes were lost, the game goes on from before them",
+                 constants.COLOR_RED))
+
+        for actor in game.current_objects:
+            if actor.actor_id == player_id:
+                return game, actor
+
+        raise ValueError("save file has no PLAYER")
+
+    def slot(self):
+        """ The struc_SaveSlot of the file, from its headers alone. """
+        with open(self.file_name, "rb") as file:
+            header = file.read(self.HEADER.size + self.SLOT.size)
+
+        magic, version, codec = self.HEADER.unpack_from(header)
+
+        if magic != self.MAGIC:
+            raise ValueError(self.file_name + " is not a save file")
+        if version != self.VERSION:
+            return struc_SaveSlot(self.file_name, version, None, None, None, None)
+
+        name, depth, turn_count, timestamp = self.SLOT.unpack_from(header, self.HEADER.size)
+
+        return struc_SaveSlot(self.file_name, version,
+                              name.rstrip(b"\0").decode("utf-8", "replace"),
+                              depth, turn_count, timestamp)
+
+    def snapshot(self, game, player):
+        """
+        game and player copied out as the slot header and the records of the
+        GAME section and of every level.
+        """
+        levels = (game.maps_previous +
+                  [((player.x, player.y), game.current_map, game.current_rooms,
+                    game.current_objects)] +
+                  game.maps_next)
+
+        self.save_id = time.time_ns()
+
+        return ((player.creature.name_instance.encode("utf-8"),
+                 len(game.maps_previous) + 1,
+                 game.turn_count,
+                 int(time.time())),
+                (game.turn_count,
+                 list(game.message_history),
+                 len(game.maps_previous),
+                 player.actor_id,
+                 self.save_id),
+                [self.level_record(*level) for level in levels])
+
+    def sections(self, snapshot):
+        """ The uncompressed (tag, bytes) sections of a snapshot. """
+        slot_record, game_record, level_records = snapshot
+
+        return ([(b"GAME", pickle.dumps(game_record, pickle.HIGHEST_PROTOCOL))] +
+                [(b"LEVL", self.level_pack(record)) for record in level_records])
+
+    def write(self, snapshot):
+        sections = self.sections(snapshot)
+        slot_record = snapshot[0]
+
+        os.makedirs(os.path.dirname(self.file_name), exist_ok=True)
+
+        # never leave a half written save behind
+        temp_file = self.file_name + ".tmp"
+        with open(temp_file, "wb") as file:
+            file.write(self.HEADER.pack(self.MAGIC, self.VERSION, self.CODECS.index(self.codec)))
+            file.write(self.SLOT.pack(*slot_record))
+
+            for tag, data in sections:
+                stored = self.compress(data)
+                file.write(self.SECTION.pack(tag, len(data), len(stored)))
+                file.write(stored)
+
+        os.replace(temp_file, self.file_name)
+
+        # the file now holds every turn the journal did
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+
+    def read(self):
+        """ The (tag, bytes) sections of the file, uncompressed. """
+        with open(self.file_name, "rb") as file:
+            magic, version, codec = self.HEADER.unpack(file.read(self.HEADER.size))
+
+            if magic != self.MAGIC:
+                raise ValueError(self.file_name + " is not a save file")
+            if version != self.VERSION:
+                raise ValueError("save format version " + str(version) + " is not supported")
+
+            self.codec = self.CODECS[codec]
+            file.read(self.SLOT.size)
+
+            sections = []
+            header = file.read(self.SECTION.size)
+            while header:
+                tag, size, stored_size = self.SECTION.unpack(header)
+                data = self.decompress(file.read(stored_size))
+
+                if len(data) != size:
+                    raise ValueError("save file section " + repr(tag) + " is damaged")
+
+                sections.append((tag, data))
+                header = file.read(self.SECTION.size)
+
+        return sections
+
+    def journal_entry(self, game, actors, removed, kind_cells, explored_cells, num_messages):
+        """ The journal entry of what changed since the last one, copied out like a snapshot. """
+        tile_map = game.current_map
+
+        return (self.save_id,
+                game.turn_count,
+                game.message_history[num_messages:],
+                [self.actor_record(actor) for actor in actors],
+                list(removed),
+                kind_cells, tile_map.kind.flat[kind_cells],
+                explored_cells)
+
+    def journal_append(self, entry):
+        data = pickle.dumps(entry, pickle.HIGHEST_PROTOCOL)
+
+        os.makedirs(os.path.dirname(self.journal_file), exist_ok=True)
+
+        with open(self.journal_file, "ab") as file:
+            file.write(self.ENTRY.pack(len(data), zlib.crc32(data)) + data)
+
+    def journal_read(self):
+        """ The entries of the journal, up to the first one cut short. """
+        if not os.path.exists(self.journal_file):
+            return []
+
+        with open(self.journal_file, "rb") as file:
+            data = file.read()
+
+        entries = []
+        offset = 0
+        while offset + self.ENTRY.size <= len(data):
+            size, crc = self.ENTRY.unpack_from(data, offset)
+            offset += self.ENTRY.size
+
+            entry = data[offset:offset + size]
+            if len(entry) != size or zlib.crc32(entry) != crc:
+                break
+
+            entries.append(pickle.loads(entry))
+            offset += size
+
+        return entries
+
+    def journal_apply(self, game, entry):
+        (save_id, turn_count, messages, actors, removed, kind_cells, kind,
+            explored_cells) = entry
+        objects = game.current_objects
+        tile_map = game.current_map
+
+        game.turn_count = turn_count
+        game.message_history.extend(messages)
+
+        actors_by_id = {actor.actor_id: actor for actor in objects}
+
+        for actor_id in removed:
+            actor = actors_by_id.pop(actor_id, None)
+            if actor:
+                objects.remove(actor)
+
+        for record in actors:
+            actor = self.actor_build(record)
+            old_actor = actors_by_id.get(actor.actor_id)
+
+            if old_actor:
+                objects.replace(old_actor, actor)
+            else:
+                objects.append(actor)
+            actors_by_id[actor.actor_id] = actor
+
+        tile_map.set_tiles(numpy.unravel_index(kind_cells, tile_map.kind.shape), kind)
+        tile_map.explored.flat[explored_cells] = True
+
+    def compress(self, data):
+        if self.codec == "zlib":
+            return zlib.compress(data, self.zlib_level)
+        if self.codec == "lzma":
+            return lzma.compress(data)
+        return data
+
+    def decompress(self, data):
+        if self.codec == "zlib":
+            return zlib.decompress(data)
+        if self.codec == "lzma":
+            return lzma.decompress(data)
+        return data
+
+    def level_record(self, T_coords, tile_map, rooms, actors):
+        x, y = T_coords
+
+        return (tile_map.width, tile_map.height, x, y,
+                tile_map.kind.copy(), tile_map.explored.copy(),
+                [(room.x1, room.y1, room.w, room.h) for room in rooms],
+                [self.actor_record(actor) for actor in actors])
+
+    def level_pack(self, level_record):
+        width, height, x, y, kind, explored, rooms, actors = level_record
+
+        return b"".join((self.LEVEL.pack(width, height, x, y),
+                         kind.tobytes(),
+                         numpy.packbits(explored).tobytes(),
+                         pickle.dumps((rooms, actors), pickle.HIGHEST_PROTOCOL)))
+
+    def level_unpack(self, data):
+        width, height, x, y = self.LEVEL.unpack_from(data)
+        offset = self.LEVEL.size
+
+        tile_map = obj_TileMap(width, height)
+        kind = numpy.frombuffer(data, numpy.uint8, width * height, offset).reshape(width, height)
+        tile_map.set_tiles(slice(None), kind)
+        offset += width * height
+
+        explored_size = (width * height + 7) // 8
+        explored = numpy.frombuffer(data, numpy.uint8, explored_size, offset)
+        tile_map.explored[:] = numpy.unpackbits(explored, count=width * height).reshape(width, height)
+        offset += explored_size
+
+        rooms, actors = pickle.loads(data[offset:])
+
+        return ((x, y),
+                tile_map,
+                [obj_Room((x1, y1), (w, h)) for x1, y1, w, h in rooms],
+                obj_ActorList([self.actor_build(record) for record in actors]))
+
+    def actor_record(self, actor):
+        """ actor and its components as a tuple of plain values. """
+        creature = actor.creature
+        if creature:
+            creature = (creature.name_instance, creature.base_atk, creature.base_def,
+                        creature.maxhp, creature.hp, self.function_name(creature.death_function))
+
+        container = actor.container
+        if container:
+            container = (container.max_volume,
+                         [self.actor_record(obj) for obj in container.inventory])
+
+        item = actor.item
+        if item:
+            item = (item.weight, item.volume, item.value, self.function_name(item.use_function))
+
+        equipment = actor.equipment
+        if equipment:
+            equipment = (equipment.attack_bonus, equipment.defense_bonus, equipment.slot,
+                         equipment.equipped)
+
+        return (actor.actor_id, actor.x, actor.y, actor.name_object, actor.animation_key,
+                actor.animation_speed, actor.depth, actor.state, creature,
+                self.ai_record(actor.ai), container, item, equipment,
+                actor.stairs.downwards if actor.stairs else None, bool(actor.exitportal))
+
+    def actor_build(self, record):
+        (actor_id, x, y, name_object, animation_key, animation_speed, depth, state, creature,
+         ai, container, item, equipment, stairs, exitportal) = record
+
+        if creature:
+            name_instance, base_atk, base_def, maxhp, hp, death_function = creature
+            creature = com_Creature(name_instance, base_atk, base_def, maxhp,
+                                    self.function_build(death_function))
+            creature.hp = hp
+
+        if container:
+            max_volume, inventory = container
+            container = com_Container(max_volume, [self.actor_build(obj) for obj in inventory])
+
+        if equipment:
+            attack_bonus, defense_bonus, slot, equipped = equipment
+            equipment = com_Equipment(attack_bonus, defense_bonus, slot)
+            equipment.equipped = equipped
+
+        actor = obj_Actor(x, y, name_object, animation_key,
+                          animation_speed=animation_speed,
+                          depth=depth,
+                          state=state,
+                          creature=creature,
+                          ai=self.ai_build(ai),
+                          container=container,
+                          equipment=equipment,
+                          stairs=None if stairs is None else com_Stairs(stairs),
+                          exitportal=com_ExitPortal() if exitportal else None)
+
+        actor.actor_id = actor_id
+        # actors made after loading must not take a stored id
+        obj_Actor.last_id = max(obj_Actor.last_id, actor_id)
+
+        # the AIs a confusion will hand the actor back to
+        ai = actor.ai
+        while isinstance(ai, ai_Confuse) and ai.old_ai:
+            ai.old_ai.owner = actor
+            ai = ai.old_ai
+
+        if item:
+            # equipment came with its own item
+            if not actor.item:
+                actor.item = com_Item()
+                actor.item.owner = actor
+
+            (actor.item.weight, actor.item.volume, actor.item.value,
+                use_function) = item
+            actor.item.use_function = self.function_build(use_function)
+
+        if container:
+            for obj in container.inventory:
+                obj.item.container = container
+
+        return actor
+
+    def ai_record(self, ai):
+        if ai is None:
+            return None
+        if isinstance(ai, ai_Confuse):
+            return ("ai_Confuse", ai.num_turns, self.ai_record(ai.old_ai))
+        return (type(ai).__name__,)
+
+    def ai_build(self, record):
+        if record is None:
+            return None
+        if record[0] == "ai_Confuse":
+            name, num_turns, old_ai = record
+            return ai_Confuse(self.ai_build(old_ai), num_turns)
+        if record[0] not in SAVE_AIS:
+            raise ValueError("save file names an unknown AI " + repr(record[0]))
+        return SAVE_AIS[record[0]]()
+
+    def function_name(self, function):
+        if function is None:
+            return None
+        if SAVE_FUNCTIONS.get(function.__name__) is not function:
+            raise ValueError(function.__name__ + " is not in SAVE_FUNCTIONS")
+        return function.__name__
+
+    def function_build(self, name):
+        if name is None:
+            return None
+        if name not in SAVE_FUNCTIONS:
+            raise ValueError("save file names an unknown function " + repr(name))
+        return SAVE_FUNCTIONS[name]
+
+
+class obj_AutoSave:
+    """
+    Keeps the save file within a command of the game without holding up the game loop.
+
+    update() runs after every command the game loop handles, whether or not
+    it took a turn: picking up, dropping or using the stairs don't, but
+    change the game all the same. Whatever changed is appended to the save
+    file's journal, which costs what changed: the actors the current level
+    marked dirty or removed, the PLAYER, whose inventory changes without
+    anyone being told, and the tile cells the map recorded as changed. Once
+    AUTOSAVE_TURNS turns have passed since the last full save the
+    journal is compacted into a new one. So is every change of level, a level
+    the stairs just generated can't be replayed from a journal, and so is the
+    next change after a write failed.
+
+    The main thread only copies the changes out, a single worker packs and
+    writes them in the order they came. A compaction that comes due while the
+    last one is still being written is skipped and the changes journaled
+    instead. snapshot_ms is what the last record cost the main thread.
+    """
+
+    def __init__(self, file_name):
+        self.save_file = obj_SaveFile(file_name)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.pending = None
+        self.appended = []
+        self.snapshot_ms = 0.0
+
+        # the level the journal follows
+        self.tile_map = None
+        self.num_messages = 0
+        self.turn_count = 0
+        # turn of the last full save
+        self.save_turn = 0
+
+    def use_file(self, file_name):
+        """ Saves to file_name from now on. """
+        self.wait()
+        self.save_file = obj_SaveFile(file_name)
+
+    def update(self, game, player):
+        self.appended = [future for future in self.appended if not self.finished(future)]
+
+        if game.current_map is not self.tile_map:
+            self.save(game, player, force=True)
+        elif not self.changed(game):
+            return
+        elif (game.turn_count < self.save_turn + constants.AUTOSAVE_TURNS or
+                not self.save(game, player)):
+            self.journal(game, player)
+
+    def changed(self, game):
+        """ Whether anything was marked changed since the journal last recorded the level. """
+        objects = game.current_objects
+        tile_map = game.current_map
+
+        return bool(objects.dirty or objects.removed or
+                    tile_map.kind_changed or tile_map.explored_changed or
+                    game.turn_count != self.turn_count or
+                    len(game.message_history) != self.num_messages)
+
+    def save(self, game, player, force=False):
+        """ Starts writing game in the background, False if a save is still being written. """
+        if self.busy() and not force:
+            return False
+
+        start_time = time.perf_counter()
+        snapshot = self.save_file.snapshot(game, player)
+        self.track(game)
+        self.snapshot_ms = (time.perf_counter() - start_time) * 1000
+
+        if self.pending:
+            self.appended.append(self.pending)
+        self.pending = self.executor.submit(self.save_file.write, snapshot)
+        return True
+
+    def journal(self, game, player):
+        """ Starts appending what changed since the last record to the journal. """
+        start_time = time.perf_counter()
+
+        objects = game.current_objects
+        tile_map = game.current_map
+
+        objects.dirty.add(player)
+        actors = sorted((actor for actor in objects.dirty if actor.actor_list is objects),
+                        key=objects.list_order.get)
+
+        kind_cells = numpy.array(sorted(tile_map.kind_changed), dtype=numpy.intp)
+        explored_cells = numpy.concatenate(tile_map.explored_changed + [numpy.zeros(0, numpy.intp)])
+
+        entry = self.save_file.journal_entry(game, actors, objects.removed,
+                                             kind_cells, explored_cells, self.num_messages)
+        self.num_messages = len(game.message_history)
+        self.turn_count = game.turn_count
+        objects.dirty.clear()
+        objects.removed.clear()
+        tile_map.kind_changed.clear()
+        tile_map.explored_changed.clear()
+
+        self.snapshot_ms = (time.perf_counter() - start_time) * 1000
+
+        self.appended.append(self.executor.submit(self.save_file.journal_append, entry))
+
+    def track(self, game):
+        """ Starts the journal over from game as it is now. """
+        game.current_objects.dirty.clear()
+        game.current_objects.removed.clear()
+        game.current_map.kind_changed.clear()
+        game.current_map.explored_changed.clear()
+
+        self.tile_map = game.current_map
+        self.num_messages = len(game.message_history)
+        self.turn_count = self.save_turn = game.turn_count
+
+    def busy(self):
+        if self.pending and self.finished(self.pending):
+            self.pending = None
+
+        return self.pending is not None
+
+    def wait(self):
+        """ Lets the writes in flight finish, before the file is written or removed by anyone else. """
+        futures = self.appended + ([self.pending] if self.pending else [])
+        concurrent.futures.wait(futures)
+
+        for future in futures:
+            self.finished(future)
+        self.appended = []
+        self.pending = None
+
+        # whatever comes next starts from a full save
+        self.tile_map = None
+
+    def finished(self, future):
+        """ Whether future is done, telling the player if it failed. """
+        if not future.done():
+            return False
+
+        error = future.exception()
+        if error:
+            game_message("Autosave failed: " + str(error), constants.COLOR_RED)
+            # the journal may follow a snapshot that isn't on disk, start over
+            self.tile_map = None
+
+        return True
+
+
 # Components
 #  a88888b.                                                                    dP
 # d8'   `88                                                                    88
@@ -534,14 +2252,22 @@ class com_Creature:
 
     def move(self, dx, dy):
 
-        tile_is_wall = (
-            GAME.current_map[self.owner.x + dx][self.owner.y + dy].block_path == True)
+        tile_is_wall = not GAME.current_map.walkable[self.owner.x + dx,
+                                                     self.owner.y + dy]
+        tile_is_door = (GAME.current_map.kind[self.owner.x + dx, self.owner.y + dy] ==
+                        constants.TILE_DOOR_CLOSED)
 
         target = map_check_for_creatures(
             self.owner.x + dx, self.owner.y + dy, self.owner)
 
         if target:
             self.attack(target)
+        elif tile_is_door:
+            # bumping into a closed door opens it, and uses up the move.
+            map_set_tile(self.owner.x + dx, self.owner.y + dy,
+                         constants.TILE_DOOR_OPEN)
+            if self.owner is PLAYER:
+                game_message("You open the door.")
 
         if not tile_is_wall and target is None:
             self.owner.x += dx
@@ -567,6 +2293,7 @@ class com_Creature:
 
     def take_damage(self, damage):
         self.hp -= damage
+        self.owner.changed()
         game_message(self.owner.display_name + "'s health is " +
                      str(self.hp) + "/" + str(self.maxhp), constants.COLOR_RED)
 
@@ -578,6 +2305,7 @@ class com_Creature:
         self.hp += value
         if self.hp > self.maxhp:
             self.hp = self.maxhp
+        self.owner.changed()
         game_message(self.owner.display_name + "'s health is " +
                      str(self.hp) + "/" + str(self.maxhp), constants.COLOR_GREY)
 
@@ -653,14 +2381,12 @@ class com_Item:
                 game_message(
                     ("Picking up " + self.owner.name_object), constants.COLOR_WHITE)
                 actor.container.inventory.append(self.owner)
-                self.owner.animation_destroy()
                 GAME.current_objects.remove(self.owner)
                 self.container = actor.container
 
     # def drop_item():
     def drop(self, new_x, new_y):
         GAME.current_objects.append(self.owner)
-        self.owner.animation_init()
         self.container.inventory.remove(self.owner)
         self.owner.x = new_x
         self.owner.y = new_y
@@ -750,25 +2476,26 @@ class com_ExitPortal:
         if found_lamp and not is_portal_open:
             self.owner.state = "OPEN"
             self.owner.animation_key = self.OPENANIMATION
-            self.owner.animation_init()
+            self.owner.changed()
         if not found_lamp and is_portal_open:
             self.owner.state = "CLOSED"
             self.owner.animation_key = self.CLOSEDANIMATION
-            self.owner.animation_init()
+            self.owner.changed()
 
         #         if self.owner.state is not "OPEN":
         #             self.owner.state = "OPEN"
         #             self.owner.animation_key = self.OPENANIMATION
-        #             self.owner.animation_init()
         # if not found_lamp and self.owner.state is "OPEN":
         #     self.owner.state = "CLOSED"
         #     self.owner.animation_key = self.CLOSEDANIMATION
-        #     self.owner.animation_init()
 
     def use(self):
         if self.owner.state == "OPEN":
             PLAYER.state = "STATUS_WIN"
 
+            if HEADLESS:
+                return
+
             # display game over
             SURFACE_MAIN.fill(constants.COLOR_WHITE)
             screen_center = (int(constants.CAMERA_WIDTH*0.5),
@@ -781,7 +2508,7 @@ class com_ExitPortal:
                       back_color=None,
                       center=True)
 
-            pygame.display.update()
+            RENDERER.present()
 
             # create legacy file
             fileName = ("data/HallOfFame/" + PLAYER.creature.name_instance + "." +
@@ -789,12 +2516,12 @@ class com_ExitPortal:
 
             # delete save file
             file_exists = os.path.isfile(fileName)
-            save_exists = os.path.exists("data/savedata/savegame")
+            # an autosave still being written would bring it back
+            AUTOSAVE.wait()
 
             if file_exists:
                 os.remove(fileName)
-            if save_exists:
-                os.remove("data/savedata/savegame")
+            AUTOSAVE.save_file.remove()
 
             legacy_file = open(fileName, "a+")
             legacy_file.write("******THIS CHARACTER WON!******" + "\n")
@@ -823,6 +2550,8 @@ class ai_Confuse:
         self.num_turns = num_turns
 
     def take_turn(self):
+        self.owner.changed()
+
         if self.num_turns > 0:
             self.owner.creature.move(
                 tcod.random_get_int(RAND_INSTANCE, -1, 1),
@@ -884,7 +2613,6 @@ def death_snake(monster):
     """ On death, most monsters stop moving. """
     game_message(monster.creature.name_instance +
                  " is dead!", constants.COLOR_GREY)
-    monster.animation = ASSETS.S_FLESH_01
     monster.animation_key = "S_FLESH_01"
     monster.depth = constants.DEPTH_CORPSE
     monster.creature = None
@@ -896,7 +2624,6 @@ def death_mouse(mouse):
     game_message(mouse.creature.name_instance +
                  " is dead! Eat him for more health!",
                  constants.COLOR_GREEN)
-    mouse.animation = ASSETS.S_FLESH_02
     mouse.animation_key = "S_FLESH_02"
     mouse.depth = constants.DEPTH_CORPSE
     mouse.creature = None
@@ -906,6 +2633,9 @@ def death_mouse(mouse):
 def death_player(player):
     player.state = "STATUS_DEAD"
 
+    if HEADLESS:
+        return
+
     # display game over
     SURFACE_MAIN.fill(constants.COLOR_BLACK)
     screen_center = (int(constants.CAMERA_WIDTH*0.5),
@@ -918,7 +2648,7 @@ def death_player(player):
               back_color=None,
               center=True)
 
-    pygame.display.update()
+    RENDERER.present()
 
     # create legacy file
     fileName = ("data/graveyard/" + PLAYER.creature.name_instance + "." +
@@ -926,12 +2656,12 @@ def death_player(player):
 
     # delete save file
     file_exists = os.path.isfile(fileName)
-    save_exists = os.path.exists("data/savedata/savegame")
+    # an autosave still being written would bring it back
+    AUTOSAVE.wait()
 
     if file_exists:
         os.remove(fileName)
-    if save_exists:
-        os.remove("data/savedata/savegame")
+    AUTOSAVE.save_file.remove()
 
     legacy_file = open(fileName, "a+")
     for msg, color in GAME.message_history:
@@ -952,8 +2682,7 @@ def death_player(player):
 
 
 def map_create():
-    new_map = [[struc_Tile(True) for y in range(0, constants.MAP_HEIGHT)]
-               for x in range(0, constants.MAP_WIDTH)]
+    new_map = obj_TileMap(constants.MAP_WIDTH, constants.MAP_HEIGHT)
     # for x in range(constants.MAP_WIDTH):
     #     new_map[x][0].block_path = True
     #     new_map[x][constants.MAP_HEIGHT - 1].block_path = True
@@ -996,6 +2725,8 @@ def map_create():
                 # dig the tunnels
                 map_create_tunnels(current_center, previous_center, new_map)
 
+    map_create_doors(new_map, list_of_rooms)
+
     map_make_fov(new_map)
 
     print("There are " + str(len(list_of_rooms)) + " rooms.")
@@ -1043,9 +2774,9 @@ def map_place_objects(room_list):
 
 
 def map_create_room(new_map, new_room):
-    for x in range(new_room.x1 + 1, new_room.x2):
-        for y in range(new_room.y1 + 1, new_room.y2):
-            new_map[x][y].block_path = False
+    new_map.set_tiles((slice(new_room.x1 + 1, new_room.x2),
+                       slice(new_room.y1 + 1, new_room.y2)),
+                      constants.TILE_FLOOR)
 
 
 def map_create_tunnels(coords1, coords2, new_map):
@@ -1065,57 +2796,105 @@ def map_create_tunnels(coords1, coords2, new_map):
         if ((minX == x1 and minY == y1) or
                 (minX == x2 and minY == y2)):
             # 0 (min, min) x (max, min) y
-            for x in range(minX, maxX + 1):
-                new_map[x][minY].block_path = False
-            for y in range(minY, maxY + 1):
-                new_map[maxX][y].block_path = False
+            new_map.set_tiles((slice(minX, maxX + 1), minY), constants.TILE_FLOOR)
+            new_map.set_tiles((maxX, slice(minY, maxY + 1)), constants.TILE_FLOOR)
         else:
             # 2 (min, min) x (min, min) y
-            for x in range(minX, maxX + 1):
-                new_map[x][minY].block_path = False
-            for y in range(minY, maxY + 1):
-                new_map[minX][y].block_path = False
+            new_map.set_tiles((slice(minX, maxX + 1), minY), constants.TILE_FLOOR)
+            new_map.set_tiles((minX, slice(minY, maxY + 1)), constants.TILE_FLOOR)
     else:
         if ((minX == x1 and minY == y1) or
                 (minX == x2 and minY == y2)):
             # 1 (min, min) y (min, max) x
-            for x in range(minX, maxX + 1):
-                new_map[x][maxY].block_path = False
-            for y in range(minY, maxY + 1):
-                new_map[minX][y].block_path = False
+            new_map.set_tiles((slice(minX, maxX + 1), maxY), constants.TILE_FLOOR)
+            new_map.set_tiles((minX, slice(minY, maxY + 1)), constants.TILE_FLOOR)
         else:
             # 3 (min, max) x (max, min) y
-            for x in range(minX, maxX + 1):
-                new_map[x][maxY].block_path = False
-            for y in range(minY, maxY + 1):
-                new_map[maxX][y].block_path = False
+            new_map.set_tiles((slice(minX, maxX + 1), maxY), constants.TILE_FLOOR)
+            new_map.set_tiles((maxX, slice(minY, maxY + 1)), constants.TILE_FLOOR)
+
+
+def map_create_doors(new_map, list_of_rooms):
+    """ Puts doors in some of the gaps the tunnels leave in room walls. """
+    kind = new_map.kind
+
+    for room in list_of_rooms:
+        perimeter = ([(x, room.y1) for x in range(room.x1, room.x2 + 1)] +
+                     [(x, room.y2) for x in range(room.x1, room.x2 + 1)] +
+                     [(room.x1, y) for y in range(room.y1 + 1, room.y2)] +
+                     [(room.x2, y) for y in range(room.y1 + 1, room.y2)])
+
+        for x, y in perimeter:
+            if kind[x, y] != constants.TILE_FLOOR:
+                continue
+
+            # a gap is a floor tile walled in on exactly two opposite sides.
+            gap_in_row = (kind[x - 1, y] == constants.TILE_WALL and
+                          kind[x + 1, y] == constants.TILE_WALL and
+                          kind[x, y - 1] != constants.TILE_WALL and
+                          kind[x, y + 1] != constants.TILE_WALL)
+            gap_in_column = (kind[x, y - 1] == constants.TILE_WALL and
+                             kind[x, y + 1] == constants.TILE_WALL and
+                             kind[x - 1, y] != constants.TILE_WALL and
+                             kind[x + 1, y] != constants.TILE_WALL)
+
+            if ((gap_in_row or gap_in_column) and
+                    tcod.random_get_int(RAND_INSTANCE, 1, 100) <= constants.MAP_DOOR_CHANCE):
+                new_map.set_tiles((x, y), constants.TILE_DOOR_CLOSED)
+
+
+def map_set_tile(x, y, kind):
+    """
+    Changes one cell of the current map.
+
+    Only that cell of FOV_MAP is patched, so terrain changes cost the
+    same on any map size instead of a full map_make_fov rebuild.
+    """
+    global FOV_CALCULATE
+
+    GAME.current_map.set_tiles((x, y), kind)
+    GAME.current_map.kind_changed.add(x * GAME.current_map.height + y)
+
+    tcod.map_set_properties(FOV_MAP, x, y,
+                            bool(GAME.current_map.transparent[x, y]),
+                            bool(GAME.current_map.walkable[x, y]))
+
+    FOV_CALCULATE = True
+
+
+def map_close_door(x, y):
+    """ Closes an open door unless something is standing in it. Returns True if it closed. """
+    if (GAME.current_map.kind[x, y] == constants.TILE_DOOR_OPEN and
+            len(GAME.current_objects.at(x, y)) == 0):
+        map_set_tile(x, y, constants.TILE_DOOR_CLOSED)
+        return True
+
+    return False
+
+
+def map_dig(x, y):
+    """ Turns a wall or door into floor. The outer edge of the map can't be dug. Returns True if it dug. """
+    inside_edge = (0 < x < constants.MAP_WIDTH - 1 and
+                   0 < y < constants.MAP_HEIGHT - 1)
+
+    if inside_edge and GAME.current_map.kind[x, y] != constants.TILE_FLOOR:
+        map_set_tile(x, y, constants.TILE_FLOOR)
+        return True
+
+    return False
 
 
 def map_check_for_creatures(x, y, exclude_object=None):
     target = None
-    if exclude_object:
-        # check object list to find creature at location that isn't excluded.
-        for obj in GAME.current_objects:
-            if (obj is not exclude_object and
-                obj.x == x and
-                obj.y == y and
-                    obj.creature):
 
-                target = obj
-
-        if target:
-            return target
-    else:
-        # check object list to find any creature at location.
-        for obj in GAME.current_objects:
-            if (obj.x == x and
-                obj.y == y and
-                    obj.creature):
+    # check the actors on the location to find a creature that isn't excluded.
+    for obj in GAME.current_objects.at(x, y):
+        if (obj is not exclude_object and
+                obj.creature):
 
-                target = obj
+            target = obj
 
-        if target:
-            return target
+    return target
 
 
 def map_make_fov(incoming_map):
@@ -1123,10 +2902,9 @@ def map_make_fov(incoming_map):
 
     FOV_MAP = tcod.map_new(constants.MAP_WIDTH, constants.MAP_HEIGHT)
 
-    for y in range(constants.MAP_HEIGHT):
-        for x in range(constants.MAP_WIDTH):
-            tcod.map_set_properties(FOV_MAP, x, y,
-                                    not incoming_map[x][y].block_path, not incoming_map[x][y].block_path)
+    # tcod stores its map [y, x]
+    FOV_MAP.transparent[...] = incoming_map.transparent.T
+    FOV_MAP.walkable[...] = incoming_map.walkable.T
 
 
 def map_calculate_fov():
@@ -1137,10 +2915,28 @@ def map_calculate_fov():
         tcod.map_compute_fov(FOV_MAP, PLAYER.x, PLAYER.y, constants.TORCH_RADIUS, constants.FOV_LIGHT_WALLS,
                              constants.FOV_ALGO)
 
+        # only the cells around the PLAYER can come into view
+        radius = constants.TORCH_RADIUS or max(constants.MAP_WIDTH, constants.MAP_HEIGHT)
+        min_x = max(0, PLAYER.x - radius)
+        min_y = max(0, PLAYER.y - radius)
+        window = (slice(min_x, PLAYER.x + radius + 1), slice(min_y, PLAYER.y + radius + 1))
+
+        # tcod stores its map [y, x]
+        visible = FOV_MAP.fov.T[window]
+        explored = GAME.current_map.explored[window]
+
+        new_x, new_y = numpy.nonzero(visible & ~explored)
+        if len(new_x):
+            explored |= visible
+            GAME.current_map.explored_changed.append(
+                (new_x + min_x) * GAME.current_map.height + new_y + min_y)
+
+        MAP_LAYER.dirty = True
+
 
 def map_objects_at_coords(coords_x, coords_y):
-    object_options = [obj for obj in GAME.current_objects
-                      if obj.x == coords_x and obj.y == coords_y]
+    # copied, callers pick up and use what they find.
+    object_options = list(GAME.current_objects.at(coords_x, coords_y))
 
     return object_options
 
@@ -1204,200 +3000,242 @@ def map_find_radius(coords, radius):
 
 
 def draw_game():
-    # clear the surface
-    SURFACE_MAIN.fill(constants.COLOR_DEFAULT_BG)
-    SURFACE_MAP.fill(constants.COLOR_BLACK)
+    """ Draws the game with RENDERER right away. """
+    with RENDER_LOCK:
+        draw_compose(RENDERER, draw_capture())
+
 
+def draw_capture():
+    """ Moves the camera and captures the frame it sees as a struc_DrawList. """
     CAMERA.update(PLAYER)
 
-    # display_rect = pygame.Rect(
-    #     (0 * constants.CELL_WIDTH, 0 * constants.CELL_HEIGHT),
-    #     (constants.CAMERA_WIDTH, constants.CAMERA_HEIGHT))
+    # every animation shows the frame for this moment
+    ANIMATION_CLOCK.update()
+
+    sprites = []
+    for obj in helper_camera_actors(CAMERA.rect):
+        obj.draw(sprites)
+
+    return struc_DrawList(
+        camera_rect=CAMERA.rect,
+        tile_map=GAME.current_map,
+        look=MAP_LAYER.look(GAME.current_map),
+        sprites=tuple(sprites),
+        messages=tuple(GAME.message_history[-constants.NUM_MESSAGES:]),
+        fps=int(CLOCK.get_fps()))
+
+
+def draw_compose(renderer, draw_list):
+    draw_world(renderer, draw_list)
+    draw_screen(renderer, draw_list)
+
+
+def draw_world(renderer, draw_list):
+    """ The map and the objects in view, in world space. """
+    # clear the window, the map covers the camera's view of it
+    renderer.clear(constants.COLOR_DEFAULT_BG)
 
     # draw the map
-    draw_map(GAME.current_map)
+    MAP_LAYER.update(draw_list.tile_map, draw_list.look, draw_list.camera_rect)
+    renderer.draw_map_layer(MAP_LAYER, draw_list.camera_rect)
 
     # draw all objects
-    for obj in sorted(GAME.current_objects, key=lambda obj: obj.depth, reverse=True):
-        obj.draw()
+    renderer.draw_sprites(draw_list.sprites)
 
-    SURFACE_MAIN.blit(SURFACE_MAP, (0, 0), CAMERA.rect)
 
-    draw_messages()
-    draw_debug()
+def draw_screen(renderer, draw_list):
+    """ Scales the world up to the window and draws the HUD over it. """
+    renderer.draw_view(draw_list.camera_rect)
 
+    draw_hud(renderer, draw_list.messages, draw_list.fps)
 
-def draw_map(map_to_draw):
 
-    # convert camera into address
-    cam_x, cam_y = CAMERA.map_address
-    display_map_w = int(constants.CAMERA_WIDTH / constants.CELL_WIDTH)
-    display_map_h = int(constants.CAMERA_HEIGHT / constants.CELL_HEIGHT)
+def draw_hud(renderer, messages, fps):
+    HUD.draw_messages(renderer.surface, messages)
+    HUD.draw_debug(renderer.surface, fps)
 
-    render_w_min = cam_x - int(display_map_w / 2)
-    render_h_min = cam_y - int(display_map_h / 2)
 
-    render_w_max = cam_x + int(display_map_w / 2)
-    render_h_max = cam_y + int(display_map_h / 2)
+def draw_next_animation_frame():
+    """ Clock time of the next frame change among the actors in view, None if none of them animate. """
+    next_frames = [ANIMATION_CLOCK.next_frame(obj.animation, obj.animation_speed)
+                   for obj in helper_camera_actors(CAMERA.rect)
+                   if len(obj.animation) > 1 and tcod.map_is_in_fov(FOV_MAP, obj.x, obj.y)]
 
-    if render_h_min < 0:
-        render_h_min = 0
-    if render_w_min < 0:
-        render_w_min = 0
+    if next_frames:
+        return min(next_frames)
 
-    if render_w_max > constants.MAP_WIDTH:
-        render_w_max = constants.MAP_WIDTH
-    if render_h_max > constants.MAP_HEIGHT:
-        render_h_max = constants.MAP_HEIGHT
+    return None
 
-    for x in range(render_w_min, render_w_max):
-        for y in range(render_h_min, render_h_max):
 
-            is_visible = tcod.map_is_in_fov(FOV_MAP, x, y)
-            if FOV_CALCULATE:
-                is_visible = True
+def draw_text(display_surface,
+              text_to_display,
+              T_coords,
+              text_font,
+              text_color,
+              back_color=None,
+              center=False):
+    """ this function takes in some text and displays it on the referenced surface. """
 
-            if is_visible:
+    glyph_atlas = helper_glyph_atlas(text_font)
 
-                map_to_draw[x][y].explored = True
+    text_rect = pygame.Rect((0, 0), glyph_atlas.size(text_to_display))
 
-                if map_to_draw[x][y].block_path:
-                    # draw wall
-                    SURFACE_MAP.blit(
-                        ASSETS.S_WALL, (x * constants.CELL_WIDTH, y * constants.CELL_HEIGHT))
-                else:
-                    # draw floor
-                    SURFACE_MAP.blit(
-                        ASSETS.S_FLOOR, (x * constants.CELL_WIDTH, y * constants.CELL_HEIGHT))
-            elif map_to_draw[x][y].explored:
-
-                if map_to_draw[x][y].block_path:
-                    # draw explored wall
-                    SURFACE_MAP.blit(
-                        ASSETS.S_WALLEXPLORED, (x * constants.CELL_WIDTH, y * constants.CELL_HEIGHT))
-                else:
-                    # draw explored floor
-                    SURFACE_MAP.blit(
-                        ASSETS.S_FLOOREXPLORED, (x * constants.CELL_WIDTH, y * constants.CELL_HEIGHT))
+    if not center:
+        text_rect.topleft = T_coords
+    else:
+        text_rect.center = T_coords
 
+    glyph_atlas.draw(display_surface, text_to_display, text_rect.topleft,
+                     text_color, back_color)
 
-def draw_debug():
-    draw_text(SURFACE_MAIN, "FPS: " + str(int(CLOCK.get_fps())), (0, 0),
-              constants.FONT_DEBUG_MESSAGE, constants.COLOR_WHITE, constants.COLOR_BLACK)
 
+def draw_loading(done, total):
+    """ Progress bar shown while obj_Assets loads. """
+    SURFACE_MAIN.fill(constants.COLOR_BLACK)
 
-def draw_messages():
+    center_x = constants.CAMERA_WIDTH // 2
+    center_y = constants.CAMERA_HEIGHT // 2
 
-    if len(GAME.message_history) <= constants.NUM_MESSAGES:
-        to_draw = GAME.message_history
-    else:
-        to_draw = GAME.message_history[-constants.NUM_MESSAGES:]
+    draw_text(SURFACE_MAIN, "Loading", (center_x, center_y - 30),
+              constants.FONT_DEBUG_MESSAGE, constants.COLOR_WHITE, center=True)
 
-    text_height = helper_text_height(constants.FONT_MESSAGE_TEXT)
+    bar_rect = pygame.Rect(0, 0, constants.CAMERA_WIDTH // 2, 20)
+    bar_rect.center = (center_x, center_y + 10)
 
-    start_y = (constants.CAMERA_HEIGHT -
-               (constants.NUM_MESSAGES * text_height))
+    filled_rect = bar_rect.copy()
+    filled_rect.width = bar_rect.width * done // total
 
-    for i, (message, color) in enumerate(to_draw):
-        draw_text(SURFACE_MAIN,
-                  message,
-                  (0, start_y + (i * text_height)),
-                  constants.FONT_MESSAGE_TEXT,
-                  color,
-                  constants.COLOR_BLACK)
+    SURFACE_MAIN.fill(constants.COLOR_GREEN, filled_rect)
+    pygame.draw.rect(SURFACE_MAIN, constants.COLOR_WHITE, bar_rect, 1)
 
+    RENDERER.present()
+
+    # keep the window responsive
+    pygame.event.pump()
+
+
+def draw_widgets(widgets, background):
+    """ Redraws the widgets whose state changed over background, returns the rects they cover. """
+    dirty_rects = []
+
+    for widget in widgets:
+        if widget.dirty:
+            widget.surface.blit(background, widget.rect, widget.rect)
+            dirty_rects.append(widget.draw())
+
+    return dirty_rects
+
+
+def draw_tile_rect(display_surface,
+                   T_coords,
+                   camera_rect,
+                   tile_color=constants.COLOR_WHITE,
+                   tile_alpha=constants.COLOR_ALPHA,
+                   mark=None):
+    """ Highlights map cell T_coords on display_surface, a window seen through camera_rect. """
+    x, y = T_coords
+
+    display_surface.blit(helper_tile_rect(tile_color, tile_alpha, mark),
+                         ((x * constants.CELL_WIDTH - camera_rect.x) * constants.RENDER_SCALE,
+                          (y * constants.CELL_HEIGHT - camera_rect.y) * constants.RENDER_SCALE))
+
+# Helper Functions
+# dP     dP           dP
+# 88     88           88
+# 88aaaaa88a .d8888b. 88 88d888b. .d8888b. 88d888b. .d8888b.
+# 88     88  88ooood8 88 88'  `88 88ooood8 88'  `88 Y8ooooo.
+# 88     88  88.  ... 88 88.  .88 88.  ... 88             88
+# dP     dP  `88888P' dP 88Y888P' `88888P' dP       `88888P'
+#                        88
+#                        dP
 
-def draw_text(display_surface,
-              text_to_display,
-              T_coords,
-              text_font,
-              text_color,
-              back_color=None,
-              center=False):
-    """ this function takes in some text and displays it on the referenced surface. """
 
-    text_surf, text_rect = helper_text_objects(
-        text_to_display, text_font, text_color, back_color)
+def helper_view_rects(camera_rect):
+    """ The part of the map in camera_rect, and where it goes in the window once scaled up. """
+    view_rect = camera_rect.clip(pygame.Rect(0, 0,
+                                             constants.MAP_WIDTH * constants.CELL_WIDTH,
+                                             constants.MAP_HEIGHT * constants.CELL_HEIGHT))
 
-    if not center:
-        text_rect.topleft = T_coords
-    else:
-        text_rect.center = T_coords
+    screen_rect = pygame.Rect(
+        (view_rect.x - camera_rect.x) * constants.RENDER_SCALE,
+        (view_rect.y - camera_rect.y) * constants.RENDER_SCALE,
+        view_rect.width * constants.RENDER_SCALE,
+        view_rect.height * constants.RENDER_SCALE)
 
-    display_surface.blit(text_surf, text_rect)
+    return view_rect, screen_rect
 
 
-def draw_tile_rect(T_coords,
-                   tile_color=constants.COLOR_WHITE,
-                   tile_alpha=constants.COLOR_ALPHA,
-                   mark=None):
-    x, y = T_coords
+def helper_camera_actors(camera_rect):
+    """ Actors on the cells camera_rect shows, plus a margin, in drawing order. """
+    margin = constants.CAMERA_CULL_MARGIN
 
-    # # default colors
-    # if tile_alpha: local_color = tile_color
-    # else: local_color = constants.COLOR_WHITE
+    min_x = camera_rect.left // constants.CELL_WIDTH - margin
+    min_y = camera_rect.top // constants.CELL_HEIGHT - margin
+    max_x = -(-camera_rect.right // constants.CELL_WIDTH) + margin
+    max_y = -(-camera_rect.bottom // constants.CELL_HEIGHT) + margin
 
-    # # default alpha
-    # if tile_color: local_alpha = tile_alpha
-    # else: local_alpha = constants.alpha
+    return GAME.current_objects.in_region(min_x, min_y, max_x - min_x, max_y - min_y)
 
-    new_x = x * constants.CELL_WIDTH
-    new_y = y * constants.CELL_HEIGHT
 
-    new_surface = pygame.Surface((constants.CELL_WIDTH, constants.CELL_HEIGHT))
+def helper_file_hash(file_name):
+    """ sha1 of the contents of file_name. """
+    with open(file_name, "rb") as file:
+        return hashlib.sha1(file.read()).hexdigest()
 
-    new_surface.fill(tile_color)
 
-    new_surface.set_alpha(tile_alpha)
+def helper_glyph_atlas(font):
+    glyph_atlas = GLYPH_ATLASES.get(font)
 
-    if mark:
-        # draw_text(new_surface, mark, constants.FONT_CURSOR_TEXT,
-        #     (new_x, new_y), constants.COLOR_GREY, center = True)
-        draw_text(
-            display_surface=new_surface,
-            text_to_display=mark,
-            T_coords=(constants.CELL_WIDTH/2, constants.CELL_HEIGHT/2),
-            text_font=constants.FONT_CURSOR_TEXT,
-            text_color=constants.COLOR_BLACK,
-            back_color=None,
-            center=True)
+    if glyph_atlas is None:
+        glyph_atlas = obj_GlyphAtlas(font)
+        GLYPH_ATLASES[font] = glyph_atlas
 
-    SURFACE_MAP.blit(new_surface, (new_x, new_y))
+    return glyph_atlas
 
-# Helper Functions
-# dP     dP           dP
-# 88     88           88
-# 88aaaaa88a .d8888b. 88 88d888b. .d8888b. 88d888b. .d8888b.
-# 88     88  88ooood8 88 88'  `88 88ooood8 88'  `88 Y8ooooo.
-# 88     88  88.  ... 88 88.  .88 88.  ... 88             88
-# dP     dP  `88888P' dP 88Y888P' `88888P' dP       `88888P'
-#                        88
-#                        dP
 
+def helper_menu_input():
+    """ Sleeps until there are events, then returns them with the mouse position for the ui widgets. """
+    events_list = [pygame.event.wait()]
+    events_list.extend(pygame.event.get())
 
-def helper_text_objects(incoming_text, incoming_font, incoming_color, incoming_bg):
-    if incoming_bg:
-        Text_surface = incoming_font.render(
-            incoming_text, False, incoming_color, incoming_bg)
-    else:
-        Text_surface = incoming_font.render(
-            incoming_text, False, incoming_color)
+    return events_list, pygame.mouse.get_pos()
 
-    return Text_surface, Text_surface.get_rect()
 
+def helper_tile_rect(tile_color, tile_alpha, mark):
+    """ The window sized highlight of one cell, built the first time it is asked for. """
+    key = (tuple(tile_color), tile_alpha, mark)
+    tile_rect = TILE_RECTS.get(key)
 
-def helper_text_height(font):
-    font_obj = font.render('a', False, (0, 0, 0))
-    font_rect = font_obj.get_rect()
+    if tile_rect is None:
+        new_surface = pygame.Surface((constants.CELL_WIDTH, constants.CELL_HEIGHT))
+        new_surface.fill(tile_color)
 
-    return font_rect.height
+        if mark:
+            draw_text(
+                display_surface=new_surface,
+                text_to_display=mark,
+                T_coords=(constants.CELL_WIDTH/2, constants.CELL_HEIGHT/2),
+                text_font=constants.FONT_CURSOR_TEXT,
+                text_color=constants.COLOR_BLACK,
+                back_color=None,
+                center=True)
 
+        # scaled up like the world it goes over
+        tile_rect = pygame.transform.scale(new_surface,
+                                           (constants.CELL_WIDTH * constants.RENDER_SCALE,
+                                            constants.CELL_HEIGHT * constants.RENDER_SCALE))
+        tile_rect.set_alpha(tile_alpha)
+        TILE_RECTS[key] = tile_rect
+
+    return tile_rect
 
-def helper_text_width(font, text):
-    font_obj = font.render(text, False, (0, 0, 0))
-    font_rect = font_obj.get_rect()
 
-    return font_rect.width
+def helper_text_height(font):
+    return helper_glyph_atlas(font).height
+
+
+def helper_text_width(font, text):
+    return helper_glyph_atlas(font).size(text)[0]
 
 
 # Magic
@@ -1502,11 +3340,35 @@ def cast_confusion(caster, num_turns=5):
             oldai = target.ai
             target.ai = ai_Confuse(oldai, num_turns)
             target.ai.owner = target
+            target.changed()
 
             game_message((target.display_name + "'s eyes glaze over"),
                          constants.COLOR_GREEN)
 
 
+def cast_dig(caster, max_range=5):
+
+    caster_location = (caster.x, caster.y)
+
+    menu_return = menu_tile_select(coords_origin=caster_location,
+                                   max_range=max_range,
+                                   penetrate_walls=True)
+
+    if not isinstance(menu_return, tuple):
+        return menu_return
+    else:
+        # dig out every wall and door between the CASTER and the target tile.
+        list_of_tiles = map_find_line(caster_location, menu_return)
+
+        walls_dug = False
+        for (x, y) in list_of_tiles:
+            if map_dig(x, y):
+                walls_dug = True
+
+        if walls_dug:
+            game_message("The walls crumble to dust.", constants.COLOR_WHITE)
+
+
 # UI
 # dP     dP dP
 # 88     88 88
@@ -1517,6 +3379,14 @@ def cast_confusion(caster, num_turns=5):
 
 
 class ui_Button():
+    """
+    A labelled box that reports clicks.
+
+    The box is rendered once per state ("default", "hover", "pressed") and
+    kept. dirty is set when the state changes, draw() blits the state's
+    image and returns the rect it covered.
+    """
+
     def __init__(self,
                  surface,
                  size,
@@ -1526,19 +3396,25 @@ class ui_Button():
                  color_box_mouseover=constants.COLOR_RED,
                  color_box_default=constants.COLOR_GREEN,
                  color_text_mouseover=constants.COLOR_GREY,
-                 color_text_default=constants.COLOR_BLACK):
+                 color_text_default=constants.COLOR_BLACK,
+                 color_box_pressed=None,
+                 color_text_pressed=None):
         self.surface = surface
         self.size = size
         self.center_coords = center_coords
         self.font = font
         self.button_text = button_text
 
-        self.c_box_mo = color_box_mouseover
-        self.c_box_default = color_box_default
-        self.c_text_mo = color_text_mouseover
-        self.c_text_default = color_text_default
-        self.current_c_box = self.c_box_default
-        self.current_c_text = self.c_text_default
+        # box and text colors of each state, pressed looks hovered unless told otherwise
+        self.colors = {
+            "default": (color_box_default, color_text_default),
+            "hover": (color_box_mouseover, color_text_mouseover),
+            "pressed": (color_box_pressed or color_box_mouseover,
+                        color_text_pressed or color_text_mouseover)
+        }
+        self.images = {}
+        self.state = "default"
+        self.dirty = True
 
         self.rect = pygame.Rect((0, 0), size)
         self.rect.center = self.center_coords
@@ -1558,28 +3434,57 @@ class ui_Button():
                 if event.button == 1:
                     mouse_clicked = True
 
+        if mouse_over and pygame.mouse.get_pressed()[0]:
+            state = "pressed"
+        elif mouse_over:
+            state = "hover"
+        else:
+            state = "default"
+
+        if state != self.state:
+            self.state = state
+            self.dirty = True
+
         if mouse_over and mouse_clicked:
             return True
 
-        if mouse_over:
-            self.current_c_box = self.c_box_mo
-            self.current_c_text = self.c_text_mo
-        else:
-            self.current_c_box = self.c_box_default
-            self.current_c_text = self.c_text_default
+    def image(self, state):
+        """ The button as it looks in state, rendered the first time it is asked for. """
+        image = self.images.get(state)
+
+        if image is None:
+            color_box, color_text = self.colors[state]
+
+            image = pygame.Surface(self.rect.size)
+            image.fill(color_box)
+            draw_text(display_surface=image,
+                      text_to_display=self.button_text,
+                      T_coords=(self.center_coords[0] - self.rect.x,
+                                self.center_coords[1] - self.rect.y),
+                      text_font=self.font,
+                      text_color=color_text,
+                      back_color=False,
+                      center=True)
+            self.images[state] = image
+
+        return image
 
     def draw(self):
-        pygame.draw.rect(self.surface, self.current_c_box, self.rect)
-        draw_text(display_surface=self.surface,
-                  text_to_display=self.button_text,
-                  T_coords=self.center_coords,
-                  text_font=self.font,
-                  text_color=self.current_c_text,
-                  back_color=False,
-                  center=True)
+        self.surface.blit(self.image(self.state), self.rect)
+        self.dirty = False
+
+        return self.rect
 
 
 class ui_Slider():
+    """
+    A bar setting a value between 0 and 1 while dragged.
+
+    Like ui_Button, the bar is rendered once per state and dirty is set when
+    the state or the value changes. rect covers the bar and every place the
+    grip can be.
+    """
+
     def __init__(self,
                  surface,
                  size,
@@ -1594,12 +3499,15 @@ class ui_Slider():
         self.size = size
         self.center_coords = center_coords
 
-        self.c_bg = c_bg
-        self.c_fg = c_fg
-        self.c_bg_mo = c_bg_mo
-        self.c_fg_mo = c_fg_mo
-        self.current_c_bg = self.c_bg
-        self.current_c_fg = self.c_fg
+        # background and foreground colors of each state
+        self.colors = {
+            "default": (c_bg, c_fg),
+            "hover": (c_bg_mo, c_fg_mo),
+            "pressed": (c_bg_mo, c_fg_mo)
+        }
+        self.images = {}
+        self.state = "default"
+        self.dirty = True
         self.current_val = parameter_value
 
         self.rect_bg = pygame.Rect((0, 0), size)
@@ -1615,6 +3523,8 @@ class ui_Slider():
             (20, self.rect_bg.h + 4))
         self.grip_tab.center = (self.rect_fg.right, self.rect_bg.centery)
 
+        self.rect = self.rect_bg.inflate(self.grip_tab.width, self.grip_tab.height - self.rect_bg.h)
+
     def update(self, player_input):
         mouse_down = pygame.mouse.get_pressed()[0]
 
@@ -1626,28 +3536,52 @@ class ui_Slider():
                       mouse_y >= self.rect_bg.top and
                       mouse_y <= self.rect_bg.bottom)
 
-        if mouse_over:
-            self.current_c_bg = self.c_bg_mo
-            self.current_c_fg = self.c_fg_mo
+        if mouse_down and mouse_over:
+            state = "pressed"
+        elif mouse_over:
+            state = "hover"
         else:
-            self.current_c_bg = self.c_bg
-            self.current_c_fg = self.c_fg
+            state = "default"
+
+        if state != self.state:
+            self.state = state
+            self.dirty = True
 
         if mouse_down and mouse_over:
             self.current_val = (
                 float(mouse_x) - float(self.rect_bg.left))/self.rect_bg.width
             self.rect_fg.width = self.rect_bg.width * self.current_val
             self.grip_tab.center = (self.rect_fg.right, self.rect_bg.centery)
+            self.dirty = True
 
         return self.current_val
 
+    def image(self, state):
+        """ The bar in state, background on top and foreground below, rendered the first time it is asked for. """
+        image = self.images.get(state)
+
+        if image is None:
+            c_bg, c_fg = self.colors[state]
+
+            image = pygame.Surface((self.rect_bg.width, self.rect_bg.h * 2))
+            image.fill(c_bg, (0, 0, self.rect_bg.width, self.rect_bg.h))
+            image.fill(c_fg, (0, self.rect_bg.h, self.rect_bg.width, self.rect_bg.h))
+            self.images[state] = image
+
+        return image
+
     def draw(self):
+        image = self.image(self.state)
+
         # draw background rect
-        pygame.draw.rect(self.surface, self.current_c_bg, self.rect_bg)
+        self.surface.blit(image, self.rect_bg, (0, 0, self.rect_bg.width, self.rect_bg.h))
         # draw foregound rect
-        pygame.draw.rect(self.surface, self.current_c_fg, self.rect_fg)
+        self.surface.blit(image, self.rect_fg, (0, self.rect_bg.h, self.rect_fg.width, self.rect_bg.h))
         # draw slider tab
-        pygame.draw.rect(self.surface, constants.COLOR_BLACK, self.grip_tab)
+        self.surface.fill(constants.COLOR_BLACK, self.grip_tab)
+        self.dirty = False
+
+        return self.rect
 
 
 # Menus
@@ -1658,11 +3592,11 @@ class ui_Slider():
 # 88   88   88 88.  ... 88    88 88.  .88       88
 # dP   dP   dP `88888P' dP    dP `88888P' `88888P'
 
-def menu_main():
+def menu_main(renderer="software"):
 
     y_offset = 40
 
-    game_initialize()
+    game_initialize(renderer=renderer)
     global FOV_CALCULATE
     menu_running = True
 
@@ -1714,15 +3648,47 @@ def menu_main():
         color_text_mouseover=constants.COLOR_GREY,
         color_text_default=constants.COLOR_BLACK)
 
+    menu_widgets = (continue_game_button, new_game_button, options_button, quit_button)
+    menu_redraw = True
+
     pygame.mixer.music.load(ASSETS.music_background)
     pygame.mixer.music.play(-1)
 
     while menu_running:
 
-        list_of_events = pygame.event.get()
-        mouse_position = pygame.mouse.get_pos()
+        if menu_redraw:
+            # draw menu
+            SURFACE_MAIN.blit(ASSETS.I_MAIN_MENU_BG, (0, 0))
+
+            draw_text(display_surface=SURFACE_MAIN,
+                      text_to_display=title_text,
+                      T_coords=(title_x, title_y),
+                      text_font=constants.FONT_TITLE_SCREEN,
+                      text_color=constants.COLOR_RED,
+                      back_color=constants.COLOR_BLACK,
+                      center=True)
+
+            menu_background = RENDERER.snapshot()
+
+            # the mouse may have moved while a game or the options were up
+            for widget in menu_widgets:
+                widget.update(([], pygame.mouse.get_pos()))
+                widget.dirty = True
+
+        # only the buttons whose state changed
+        dirty_rects = draw_widgets(menu_widgets, menu_background)
 
-        game_input = (list_of_events, mouse_position)
+        # update surfaces
+        if menu_redraw:
+            RENDERER.present()
+            menu_redraw = False
+        elif dirty_rects:
+            RENDERER.present(dirty_rects)
+
+        CLOCK.tick(constants.GAME_FPS)
+
+        game_input = helper_menu_input()
+        list_of_events, mouse_position = game_input
 
         # handle menu events
         for event in list_of_events:
@@ -1733,51 +3699,43 @@ def menu_main():
             break
 
         if continue_game_button.update(game_input):
-            # pygame.mixer.music.stop()
-            # FOV_CALCULATE = True
-            pygame.mixer.music.fadeout(2000)
-            game_ret = game_continue()
-            if not game_ret:
+            slot = menu_slots()
+            if slot is False:
                 break
-            game_initialize()
-            pygame.mixer.music.play(-1)
+            if slot:
+                # pygame.mixer.music.stop()
+                # FOV_CALCULATE = True
+                pygame.mixer.music.fadeout(2000)
+                game_ret = game_continue(slot)
+                if not game_ret:
+                    break
+                game_initialize()
+                pygame.mixer.music.play(-1)
+            menu_redraw = True
         elif new_game_button.update(game_input):
-            # pygame.mixer.music.stop()
-            # FOV_CALCULATE = True
-            pygame.mixer.music.fadeout(2000)
-            game_new()
-            game_ret = game_main_loop()
-            if not game_ret:
+            slot = menu_new_slot()
+            if slot is False:
                 break
-            game_initialize()
-            pygame.mixer.music.play(-1)
+            if slot:
+                # pygame.mixer.music.stop()
+                # FOV_CALCULATE = True
+                pygame.mixer.music.fadeout(2000)
+                game_new(slot)
+                game_ret = game_main_loop()
+                if not game_ret:
+                    break
+                game_initialize()
+                pygame.mixer.music.play(-1)
+            menu_redraw = True
 
         elif options_button.update(game_input):
             menu_ret = menu_options()
             if not menu_ret:
                 break
+            menu_redraw = True
         elif quit_button.update(game_input):
             break
 
-        # draw menu
-        SURFACE_MAIN.blit(ASSETS.I_MAIN_MENU_BG, (0, 0))
-
-        draw_text(display_surface=SURFACE_MAIN,
-                  text_to_display=title_text,
-                  T_coords=(title_x, title_y),
-                  text_font=constants.FONT_TITLE_SCREEN,
-                  text_color=constants.COLOR_RED,
-                  back_color=constants.COLOR_BLACK,
-                  center=True)
-
-        continue_game_button.draw()
-        new_game_button.draw()
-        options_button.draw()
-        quit_button.draw()
-
-        # update surfaces
-        pygame.display.update()
-
     pygame.quit()
 
 
@@ -1848,12 +3806,39 @@ def menu_options():
         color_text_mouseover=constants.COLOR_BLACK,
         color_text_default=constants.COLOR_BLACK)
 
+    # the panel and its labels don't change, the widgets redraw over them
+    SURFACE_MAIN.blit(settings_menu_surface, settings_menu_rect.topleft)
+
+    draw_text(
+        display_surface=SURFACE_MAIN,
+        text_to_display="SOUND",
+        T_coords=(slider_x, sound_effect_text_y),
+        text_font=constants.FONT_DEBUG_MESSAGE,
+        text_color=constants.COLOR_BLACK,
+        back_color=constants.COLOR_GREY,
+        center=True)
+
+    draw_text(
+        display_surface=SURFACE_MAIN,
+        text_to_display="MUSIC",
+        T_coords=(slider_x, music_text_y),
+        text_font=constants.FONT_DEBUG_MESSAGE,
+        text_color=constants.COLOR_BLACK,
+        back_color=constants.COLOR_GREY,
+        center=True)
+
+    menu_background = RENDERER.snapshot()
+    menu_widgets = (sound_effect_slider, music_slider, button_save)
+
+    draw_widgets(menu_widgets, menu_background)
+    RENDERER.present([settings_menu_rect])
+
     while not menu_close:
 
-        list_of_events = pygame.event.get()
-        mouse_position = pygame.mouse.get_pos()
+        CLOCK.tick(constants.GAME_FPS)
 
-        game_input = (list_of_events, mouse_position)
+        game_input = helper_menu_input()
+        list_of_events, mouse_position = game_input
 
         # handle menu events
         for event in list_of_events:
@@ -1885,34 +3870,181 @@ def menu_options():
             menu_close = True
             break
 
-        SURFACE_MAIN.blit(settings_menu_surface, settings_menu_rect.topleft)
+        dirty_rects = draw_widgets(menu_widgets, menu_background)
 
-        draw_text(
-            display_surface=SURFACE_MAIN,
-            text_to_display="SOUND",
-            T_coords=(slider_x, sound_effect_text_y),
-            text_font=constants.FONT_DEBUG_MESSAGE,
-            text_color=constants.COLOR_BLACK,
-            back_color=constants.COLOR_GREY,
-            center=True)
-        sound_effect_slider.draw()
+        if dirty_rects:
+            RENDERER.present(dirty_rects)
+
+    # preferences_save()
+    return menu_close
+
+
+def menu_slots(title="CONTINUE"):
+    """
+    Lists the save slots from their headers and returns the slot clicked.
+
+    None when the menu is closed, False when the window is.
+    """
+
+    slots = game_slots()
+
+    menu_width = 600
+    button_size = (menu_width - 40, 35)
+    y_offset = 45
+    menu_height = y_offset * (len(slots) + 1) + 20
+
+    window_center = (int(constants.CAMERA_WIDTH*0.5),
+                     int(constants.CAMERA_HEIGHT*0.5))
+
+    menu_rect = pygame.Rect(0, 0, menu_width, menu_height)
+    menu_rect.center = window_center
+
+    title_y = menu_rect.top + 30
+
+    slot_buttons = {}
+    for index, (slot, save_slot) in enumerate(slots.items()):
+        if save_slot is None and not os.path.exists(game_slot_file(slot)):
+            slot_text = str(slot) + ": empty"
+        elif save_slot is None:
+            slot_text = str(slot) + ": damaged save"
+        elif save_slot.name is None:
+            slot_text = (str(slot) + ": save format version " +
+                         str(save_slot.version))
+        else:
+            slot_text = (str(slot) + ": " + save_slot.name +
+                         ", depth " + str(save_slot.depth) +
+                         ", turn " + str(save_slot.turn_count) + ", " +
+                         datetime.datetime.fromtimestamp(save_slot.timestamp).strftime(
+                             "%Y-%m-%d %H:%M"))
+
+        slot_buttons[slot] = ui_Button(
+            surface=SURFACE_MAIN,
+            size=button_size,
+            center_coords=(menu_rect.centerx, title_y + y_offset * (index + 1)),
+            font=constants.FONT_MESSAGE_TEXT,
+            button_text=slot_text,
+            color_box_mouseover=constants.COLOR_RED,
+            color_box_default=constants.COLOR_GREEN,
+            color_text_mouseover=constants.COLOR_GREY,
+            color_text_default=constants.COLOR_BLACK)
+
+    # the panel and its title don't change, the buttons redraw over them
+    SURFACE_MAIN.fill(constants.COLOR_GREY, menu_rect)
+
+    draw_text(
+        display_surface=SURFACE_MAIN,
+        text_to_display=title,
+        T_coords=(menu_rect.centerx, title_y),
+        text_font=constants.FONT_DEBUG_MESSAGE,
+        text_color=constants.COLOR_BLACK,
+        back_color=constants.COLOR_GREY,
+        center=True)
+
+    menu_background = RENDERER.snapshot()
+    menu_widgets = tuple(slot_buttons.values())
+
+    for widget in menu_widgets:
+        widget.update(([], pygame.mouse.get_pos()))
+
+    draw_widgets(menu_widgets, menu_background)
+    RENDERER.present([menu_rect])
+
+    while True:
+
+        CLOCK.tick(constants.GAME_FPS)
+
+        game_input = helper_menu_input()
+        list_of_events, mouse_position = game_input
+
+        for event in list_of_events:
+            if event.type == pygame.QUIT:
+                return False
+            elif event.type == pygame.KEYDOWN:
+                if (event.key == pygame.K_ESCAPE or
+                        event.key == pygame.K_TAB):
+                    return None
+
+        for slot, button in slot_buttons.items():
+            if button.update(game_input):
+                return slot
+
+        dirty_rects = draw_widgets(menu_widgets, menu_background)
+
+        if dirty_rects:
+            RENDERER.present(dirty_rects)
+
+
+def menu_message(lines):
+    """
+    Shows lines over the screen until a key or a mouse button is pressed.
+
+    Returns that KEYDOWN or MOUSEBUTTONDOWN event, False when the window is closed.
+    """
+
+    line_height = helper_text_height(constants.FONT_MESSAGE_TEXT) + 10
+    menu_width = max(helper_text_width(constants.FONT_MESSAGE_TEXT, line)
+                     for line in lines) + 40
+    menu_height = line_height * len(lines) + 30
+
+    menu_rect = pygame.Rect(0, 0, menu_width, menu_height)
+    menu_rect.center = (int(constants.CAMERA_WIDTH*0.5),
+                        int(constants.CAMERA_HEIGHT*0.5))
 
+    SURFACE_MAIN.fill(constants.COLOR_GREY, menu_rect)
+
+    for index, line in enumerate(lines):
         draw_text(
             display_surface=SURFACE_MAIN,
-            text_to_display="MUSIC",
-            T_coords=(slider_x, music_text_y),
-            text_font=constants.FONT_DEBUG_MESSAGE,
+            text_to_display=line,
+            T_coords=(menu_rect.centerx, menu_rect.top + 15 + line_height * (index + 0.5)),
+            text_font=constants.FONT_MESSAGE_TEXT,
             text_color=constants.COLOR_BLACK,
             back_color=constants.COLOR_GREY,
             center=True)
-        music_slider.draw()
 
-        button_save.draw()
+    RENDERER.present([menu_rect])
 
-        pygame.display.update()
+    while True:
+        list_of_events, mouse_position = helper_menu_input()
 
-    # preferences_save()
-    return menu_close
+        for event in list_of_events:
+            if event.type == pygame.QUIT:
+                return False
+            if event.type in (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN):
+                return event
+
+
+def menu_confirm(lines):
+    """ menu_message asking yes or no, True for yes, None for no, False when the window is closed. """
+    event = menu_message(lines + ["Y: yes, any other key: no"])
+
+    if event is False:
+        return False
+    if event.type == pygame.KEYDOWN and event.key == pygame.K_y:
+        return True
+    return None
+
+
+def menu_new_slot():
+    """
+    The slot for a new game: the first empty one, else the one the player
+    picks and confirms starting over. None when they back out, False when
+    the window is closed.
+    """
+    slot = game_empty_slot()
+    if slot is not None:
+        return slot
+
+    slot = menu_slots("NEW GAME")
+    if not slot or not os.path.exists(game_slot_file(slot)):
+        return slot
+
+    confirmed = menu_confirm(["Slot " + str(slot) + " holds a save",
+                              "Start a new game over it?"])
+    if not confirmed:
+        return confirmed
+
+    return slot
 
 
 def menu_pause():
@@ -1947,7 +4079,7 @@ def menu_pause():
 
         CLOCK.tick(constants.GAME_FPS)
 
-        pygame.display.flip()
+        RENDERER.present()
     return 'no-action'
 
 
@@ -1967,6 +4099,10 @@ def menu_inventory():
 
     local_inventory_surface = pygame.Surface((menu_width, menu_height))
 
+    # the game doesn't move while the menu is open, draw it once
+    draw_game()
+    world_frame = RENDERER.snapshot()
+
     while not menu_close:
 
         # Clear the menu.
@@ -2026,6 +4162,10 @@ def menu_inventory():
                             PLAYER.container.inventory[mouse_line_selection].item.drop(
                                 PLAYER.x, PLAYER.y)
 
+                    # the item shows on the map or its effect in the messages
+                    draw_game()
+                    world_frame = RENDERER.snapshot()
+
         # Draw list.
         for line, (name) in enumerate(print_list):
             if line == mouse_line_selection and mouse_in_window:
@@ -2052,14 +4192,14 @@ def menu_inventory():
                           constants.COLOR_BLACK)
 
         # Render game
-        draw_game()
+        RENDERER.restore(world_frame)
 
         # Display Menu
         SURFACE_MAIN.blit(local_inventory_surface,
                           (window_width, window_height))
 
         CLOCK.tick(constants.GAME_FPS)
-        pygame.display.flip()
+        RENDERER.present()
     return 'no-action'
 
 
@@ -2074,6 +4214,15 @@ def menu_tile_select(coords_origin=None, max_range=None, radius=None,
     """
     menu_close = False
 
+    # the game doesn't move while aiming, draw it once without the HUD,
+    # then the highlights and the HUD over it
+    draw_list = draw_capture()
+    with RENDER_LOCK:
+        draw_world(RENDERER, draw_list)
+        RENDERER.draw_view(draw_list.camera_rect)
+        world_frame = RENDERER.snapshot()
+    camera_rect = draw_list.camera_rect
+
     while not menu_close:
 
         # Get mouse position
@@ -2105,7 +4254,7 @@ def menu_tile_select(coords_origin=None, max_range=None, radius=None,
 
                 # stop at wall
                 if (not penetrate_walls and
-                        GAME.current_map[x][y].block_path):
+                        not GAME.current_map.walkable[x, y]):
                     break
 
                 # stop at creature.
@@ -2129,41 +4278,24 @@ def menu_tile_select(coords_origin=None, max_range=None, radius=None,
                     return valid_tiles[-1]
 
         # draw game first
-        SURFACE_MAIN.fill(constants.COLOR_DEFAULT_BG)
-        SURFACE_MAP.fill(constants.COLOR_BLACK)
-
-        CAMERA.update(PLAYER)
-
-        # display_rect = pygame.Rect(
-        #     (0 * constants.CELL_WIDTH, 0 * constants.CELL_HEIGHT),
-        #     (constants.CAMERA_WIDTH, constants.CAMERA_HEIGHT))
-
-        # draw the map
-        draw_map(GAME.current_map)
-
-        # draw all objects
-        for obj in sorted(GAME.current_objects, key=lambda obj: obj.depth, reverse=True):
-            obj.draw()
+        RENDERER.restore(world_frame)
 
         # draw rectangle at mouse position on top of game
         for (tile_x, tile_y) in valid_tiles:
             if not(tile_x, tile_y) == valid_tiles[-1]:
-                draw_tile_rect((tile_x, tile_y))
+                draw_tile_rect(SURFACE_MAIN, (tile_x, tile_y), camera_rect)
             else:
-                draw_tile_rect((tile_x, tile_y), mark='X')
+                draw_tile_rect(SURFACE_MAIN, (tile_x, tile_y), camera_rect, mark='X')
         if radius:
             area_effect = map_find_radius(valid_tiles[-1], radius)
             for tile_x, tile_y in area_effect:
-                draw_tile_rect((tile_x, tile_y),
+                draw_tile_rect(SURFACE_MAIN, (tile_x, tile_y), camera_rect,
                                tile_color=constants.COLOR_RED)
 
-        SURFACE_MAIN.blit(SURFACE_MAP, (0, 0), CAMERA.rect)
-
-        draw_messages()
-        draw_debug()
+        draw_hud(RENDERER, draw_list.messages, int(CLOCK.get_fps()))
 
         # update the display
-        pygame.display.flip()
+        RENDERER.present()
 
         # tick the CLOCK
         CLOCK.tick(constants.GAME_FPS)
@@ -2247,7 +4379,7 @@ def gen_LAMP(coords):
 
 # ITEMS
 def gen_item(coords):
-    random_num = tcod.random_get_int(RAND_INSTANCE, 1, 5)
+    random_num = tcod.random_get_int(RAND_INSTANCE, 1, 6)
     new_item = None
 
     if (random_num == 1):
@@ -2260,6 +4392,8 @@ def gen_item(coords):
         new_item = gen_weapon_sword(coords)
     elif (random_num == 5):
         new_item = gen_armor_shield(coords)
+    elif (random_num == 6):
+        new_item = gen_scroll_digging(coords)
     else:
         new_item = gen_scroll_confusion(coords)
 
@@ -2316,6 +4450,22 @@ def gen_scroll_confusion(coords):
     return return_object
 
 
+def gen_scroll_digging(coords):
+    x, y = coords
+
+    m_range = tcod.random_get_int(RAND_INSTANCE, 4, 6)
+
+    item_com = com_Item(use_function=cast_dig,
+                        value=m_range)
+
+    return_object = obj_Actor(x, y, "digging scroll",
+                              animation_key="S_SCROLL_BROWN",
+                              depth=constants.DEPTH_ITEM,
+                              item=item_com)
+
+    return return_object
+
+
 def gen_weapon_sword(coords):
     x, y = coords
 
@@ -2488,45 +4638,178 @@ def game_main_loop():
     # player action definition
     player_action = "no-action"
 
-    while not game_quit:
-        # player action definition
+    # only draw when something on screen can have changed
+    scheduler = obj_RenderScheduler()
+
+    # draw frames off the main thread, an SDL renderer has to stay on the thread that made it
+    if isinstance(RENDERER, obj_SurfaceRenderer):
+        render_thread = obj_RenderThread()
+    else:
+        render_thread = None
+
+    try:
+        while not game_quit:
+            # player action definition
+
+            # sleep until there is input or something to animate
+            scheduler.wait()
+
+            # handle player input
+            player_action = game_handle_keys()
+
+            map_calculate_fov()
+
+            if player_action == "quit":
+                if render_thread:
+                    render_thread.stop()
+                    render_thread = None
+                return game_exit()
+                # break
+            # turn-based system
+            game_quit = game_take_turn(player_action)
+
+            # pickups, drops and stairs change the game without taking a turn,
+            # anything but an animation wakeup may have changed it
+            if scheduler.input_pending and not game_quit:
+                AUTOSAVE.update(GAME, PLAYER)
+
+            if scheduler.frame_due():
+                # draw the game
+                if render_thread:
+                    render_thread.submit(draw_capture())
+                else:
+                    draw_game()
+
+                    # update the display
+                    RENDERER.present()
+
+                scheduler.frame_drawn()
+
+                CLOCK.tick(constants.GAME_FPS)
+
+            if render_thread:
+                render_thread.present()
+    finally:
+        if render_thread:
+            render_thread.stop()
+
+    return game_quit
+
+
+def game_take_turn(player_action):
+    """ Lets every other object act once the PLAYER has. Returns True when the game is over. """
+    if player_action != "no-action":
+        GAME.turn_count += 1
 
-        # handle player input
-        player_action = game_handle_keys()
+    for obj in GAME.current_objects:
+        if obj.ai:
+            if player_action != "no-action":
+                obj.ai.take_turn()
+        if obj.exitportal:
+            obj.exitportal.update()
+
+    return (PLAYER.state == "STATUS_DEAD" or
+            PLAYER.state == "STATUS_WIN")
+
+
+def game_simulate(command_source, max_turns):
+    """
+    Runs the turn logic without rendering or frame limiting.
+
+    command_source : iterable of commands understood by game_handle_command
+    max_turns : number of turns to run, a new game is started whenever one ends.
+
+    Only commands that take a turn are counted: pickups, drops, stairs and a
+    close with no door to close don't. Returns (turns, games, seconds).
+    """
+    turns = 0
+    games = 1
+    start_time = time.perf_counter()
+
+    for command in command_source:
+        if turns >= max_turns:
+            break
+
+        player_action = game_handle_command(command)
 
         map_calculate_fov()
 
-        if player_action == "quit":
-            return game_exit()
-            # break
-        # turn-based system
-        for obj in GAME.current_objects:
-            if obj.ai:
-                if player_action != "no-action":
-                    obj.ai.take_turn()
-            if obj.exitportal:
-                obj.exitportal.update()
+        if player_action != "no-action":
+            turns += 1
 
-        if (PLAYER.state == "STATUS_DEAD" or
-                PLAYER.state == "STATUS_WIN"):
-            game_quit = True
+        if game_take_turn(player_action):
+            game_new()
+            games += 1
 
-        # draw the game
-        draw_game()
+    return turns, games, time.perf_counter() - start_time
 
-        # update the display
-        pygame.display.flip()
 
-        CLOCK.tick(constants.GAME_FPS)
+def game_random_commands():
+    """ Endless command source that wanders the PLAYER around the map. """
+    commands = ["up", "down", "left", "right", "wait", "pickup", "close", "stairs"]
+    while True:
+        yield commands[tcod.random_get_int(RAND_INSTANCE, 0, len(commands) - 1)]
 
-    return game_quit
 
+def game_file_commands(file_name):
+    """ Command source that reads whitespace separated commands from a file. """
+    with open(file_name) as file:
+        for line in file:
+            for command in line.split():
+                yield command
 
-def game_initialize():
+
+def game_headless(max_turns, commands_file=None, seed=None):
+    ''' Runs a headless simulation and reports the turn rate. '''
+    game_initialize(headless=True, seed=seed)
+
+    if game_empty_slot() is None:
+        print("Every save slot holds a save, free one to run headless")
+        pygame.quit()
+        return None
+
+    game_new()
+
+    if commands_file:
+        command_source = game_file_commands(commands_file)
+    else:
+        command_source = game_random_commands()
+
+    turns, games, seconds = game_simulate(command_source, max_turns)
+
+    turns_per_second = turns / seconds if seconds > 0 else float("inf")
+    print("Simulated " + str(turns) + " turns over " + str(games) +
+          " games in " + "{:.3f}".format(seconds) + "s (" +
+          "{:.0f}".format(turns_per_second) + " turns/s)")
+
+    pygame.quit()
+
+    return turns_per_second
+
+
+# set by the first game_initialize
+ASSETS = None
+RENDERER = None
+AUTOSAVE = None
+
+
+def game_initialize(headless=False, seed=None, renderer="software"):
     ''' This function initializes the main window and pygame'''
 
-    global PREFERENCES, SURFACE_MAIN, SURFACE_MAP, CAMERA, RAND_INSTANCE, CLOCK
-    global ASSETS, FOV_CALCULATE
+    global PREFERENCES, SURFACE_MAIN, CAMERA, RAND_INSTANCE, CLOCK
+    global ASSETS, FOV_CALCULATE, HEADLESS, MAP_LAYER, GLYPH_ATLASES, HUD, ANIMATION_CLOCK
+    global TILE_RECTS
+    global RENDERER, RENDER_LOCK, AUTOSAVE
+
+    HEADLESS = headless
+
+    if HEADLESS:
+        # constants already initialized pygame, restart the display and mixer
+        # on the dummy drivers, a full pygame.quit() would free the fonts
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+        pygame.display.quit()
+        pygame.mixer.quit()
 
     # initialize pygame
     pygame.init()
@@ -2542,27 +4825,61 @@ def game_initialize():
     # tcod.namegen_parse("data/namegen/jice_fantasy.cfg")
     # tcod.namegen_parse("data/namegen/jice_mesopotamian.cfg")
 
-    SURFACE_MAIN = pygame.display.set_mode(
-        (constants.CAMERA_WIDTH, constants.CAMERA_HEIGHT)
-        # pygame.HWSURFACE | pygame.RESIZABLE
-    )
+    # the window is opened once, renderer only matters on the first call
+    if RENDERER is None:
+        if renderer == "texture" and video and not HEADLESS:
+            RENDERER = obj_TextureRenderer()
+        else:
+            if renderer == "texture" and not HEADLESS:
+                print("pygame._sdl2 is not available, using the software renderer")
+            RENDERER = obj_SurfaceRenderer()
+
+    SURFACE_MAIN = RENDERER.surface
+
+    # held while drawing, so a render thread and the menus take turns
+    RENDER_LOCK = threading.RLock()
 
-    SURFACE_MAP = pygame.Surface((constants.MAP_WIDTH*constants.CELL_WIDTH,
-                                  constants.MAP_HEIGHT*constants.CELL_HEIGHT))
+    GLYPH_ATLASES = {}
+    for font in (constants.FONT_TITLE_SCREEN,
+                 constants.FONT_DEBUG_MESSAGE,
+                 constants.FONT_MESSAGE_TEXT,
+                 constants.FONT_CURSOR_TEXT):
+        helper_glyph_atlas(font)
+
+    # cell highlights by color, alpha and mark
+    TILE_RECTS = {}
 
     CAMERA = obj_Camera()
 
-    RAND_INSTANCE = None  # tcod.random_new_from_seed(1000)
+    if seed is not None:
+        RAND_INSTANCE = tcod.random_new_from_seed(seed)
+    else:
+        RAND_INSTANCE = None
 
     CLOCK = pygame.time.Clock()
 
-    ASSETS = obj_Assets()
+    ANIMATION_CLOCK = obj_AnimationClock()
+
+    HUD = obj_Hud()
+
+    # assets are loaded once and kept when returning to the menu
+    if ASSETS is None:
+        if HEADLESS:
+            ASSETS = obj_Assets()
+        else:
+            ASSETS = obj_Assets(draw_loading)
+    else:
+        ASSETS.volume_adjust()
+
+    MAP_LAYER = obj_MapLayer()
+
+    if AUTOSAVE is None:
+        AUTOSAVE = obj_AutoSave(game_slot_file(1))
 
     FOV_CALCULATE = True
 
 
 def game_handle_keys():
-    global FOV_CALCULATE
     # get player input
     keys_list = pygame.key.get_pressed()
     events_list = pygame.event.get()
@@ -2577,30 +4894,19 @@ def game_handle_keys():
 
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_UP:
-                PLAYER.creature.move(0, -1)
-                FOV_CALCULATE = True
-                return "player-moved"
+                return game_handle_command("up")
             if event.key == pygame.K_DOWN:
-                PLAYER.creature.move(0, 1)
-                FOV_CALCULATE = True
-                return "player-moved"
+                return game_handle_command("down")
             if event.key == pygame.K_LEFT:
-                PLAYER.creature.move(-1, 0)
-                FOV_CALCULATE = True
-                return "player-moved"
+                return game_handle_command("left")
             if event.key == pygame.K_RIGHT:
-                PLAYER.creature.move(1, 0)
-                FOV_CALCULATE = True
-                return "player-moved"
+                return game_handle_command("right")
             if event.key == pygame.K_g:
-                objects_at_player = map_objects_at_coords(PLAYER.x, PLAYER.y)
-                for obj in objects_at_player:
-                    if obj.item:
-                        obj.item.pick_up(PLAYER)
+                game_handle_command("pickup")
             if event.key == pygame.K_d:
-                if len(PLAYER.container.inventory) > 0:
-                    PLAYER.container.inventory[-1].item.drop(
-                        PLAYER.x, PLAYER.y)
+                game_handle_command("drop")
+            if event.key == pygame.K_x:
+                return game_handle_command("close")
             if event.key == pygame.K_p:
                 return menu_pause()
             if event.key == pygame.K_i:
@@ -2613,12 +4919,7 @@ def game_handle_keys():
             if event.key == pygame.K_c:
                 return cast_confusion(PLAYER)
             if MOD_KEY and event.key == pygame.K_PERIOD:
-                list_of_objs = map_objects_at_coords(PLAYER.x, PLAYER.y)
-                for obj in list_of_objs:
-                    if obj.stairs:
-                        obj.stairs.use()
-                    if obj.exitportal:
-                        obj.exitportal.use()
+                game_handle_command("stairs")
             # if event.key == pygame.K_SPACE:
             #     GAME.transition_next()
             #     # PLAYER.x, PLAYER.y = GAME.current_rooms[0].center
@@ -2628,15 +4929,74 @@ def game_handle_keys():
     return "no-action"
 
 
+def game_handle_command(command):
+    """
+    Carries out a single PLAYER command.
+
+    Shared by the keyboard and by scripted command sources, so it must never draw.
+    commands : up, down, left, right, wait, pickup, drop, close, stairs
+    """
+    global FOV_CALCULATE
+
+    move_directions = {"up": (0, -1),
+                       "down": (0, 1),
+                       "left": (-1, 0),
+                       "right": (1, 0)}
+
+    if command in move_directions:
+        dx, dy = move_directions[command]
+        PLAYER.creature.move(dx, dy)
+        FOV_CALCULATE = True
+        return "player-moved"
+    if command == "wait":
+        return "player-waited"
+    if command == "pickup":
+        objects_at_player = map_objects_at_coords(PLAYER.x, PLAYER.y)
+        for obj in objects_at_player:
+            if obj.item:
+                obj.item.pick_up(PLAYER)
+    if command == "drop":
+        if len(PLAYER.container.inventory) > 0:
+            PLAYER.container.inventory[-1].item.drop(
+                PLAYER.x, PLAYER.y)
+    if command == "close":
+        doors_closed = False
+        for (x, y) in map_find_radius((PLAYER.x, PLAYER.y), 1):
+            if map_close_door(x, y):
+                doors_closed = True
+        if doors_closed:
+            return "player-closed-door"
+    if command == "stairs":
+        list_of_objs = map_objects_at_coords(PLAYER.x, PLAYER.y)
+        for obj in list_of_objs:
+            if obj.stairs:
+                obj.stairs.use()
+            if obj.exitportal:
+                obj.exitportal.use()
+
+    return "no-action"
+
+
 def game_message(game_msg, msg_color=constants.COLOR_GREY):
     GAME.message_history.append((game_msg, msg_color))
-    print(game_msg)
-
+    if not HEADLESS:
+        print(game_msg)
 
-def game_new():
 
+def game_new(slot=None):
+    """
+    Starts a game saved to slot, by default the first empty slot. Only the
+    player gets to choose a slot that holds a save, see menu_new_slot.
+    """
     global GAME, PLAYER
 
+    if slot is None:
+        slot = game_empty_slot()
+        if slot is None:
+            raise ValueError("every save slot holds a save")
+
+    AUTOSAVE.use_file(game_slot_file(slot))
+
     GAME = obj_Game()
 
     PLAYER = gen_player(GAME.current_rooms[0].center)
@@ -2657,41 +5017,77 @@ def game_exit():
     return False
 
 
-def game_save():
-    global GAME, PLAYER
+# what obj_SaveFile may store by name
+SAVE_FUNCTIONS = {function.__name__: function for function in (
+    death_snake, death_mouse, death_player,
+    cast_heal, cast_lightning, cast_fireball, cast_confusion, cast_dig)}
+SAVE_AIS = {ai.__name__: ai for ai in (ai_Chase, ai_Flee, ai_Confuse)}
+# what a damaged or foreign save file makes obj_SaveFile.load raise
+SAVE_LOAD_ERRORS = (OSError, EOFError, ValueError, struct.error, zlib.error,
+                    lzma.LZMAError, pickle.UnpicklingError)
 
-    for obj in GAME.current_objects:
-        obj.animation_destroy()
-        if obj.container:
-            for objec in obj.container.inventory:
-                objec.animation_destroy()
 
-    with gzip.open("data/savedata/savegame", "wb") as file:
-        pickle.dump([GAME, PLAYER], file)
+def game_slot_file(slot):
+    """ The save file of slot, numbered from 1. """
+    return constants.SAVE_FILE + str(slot)
 
 
-def game_load():
+def game_slots():
+    """ The struc_SaveSlot of every slot, None for slots without a readable save. """
+    slots = {}
+
+    for slot in range(1, constants.SAVE_SLOTS + 1):
+        try:
+            slots[slot] = obj_SaveFile(game_slot_file(slot)).slot()
+        except (OSError, ValueError, struct.error):
+            slots[slot] = None
+
+    return slots
+
+
+def game_empty_slot():
+    """ The first slot without a save file, None if there is none. """
+    for slot in range(1, constants.SAVE_SLOTS + 1):
+        # a damaged save is kept, it may still be recovered
+        if not os.path.exists(game_slot_file(slot)):
+            return slot
+
+    return None
+
+
+def game_save(codec=constants.SAVE_CODEC):
+    # an autosave finishing later would overwrite this one
+    AUTOSAVE.wait()
+
+    obj_SaveFile(AUTOSAVE.save_file.file_name, codec).save(GAME, PLAYER)
+
+
+def game_load(slot):
+    """ Plays the game saved in slot from now on, if it can't be read raises and changes nothing. """
     global GAME, PLAYER
 
-    with gzip.open('data/savedata/savegame', 'rb') as file:
-        GAME, PLAYER = pickle.load(file)
+    # an autosave in flight may still be writing to the slot
+    AUTOSAVE.wait()
 
-    for obj in GAME.current_objects:
-        obj.animation_init()
-        if obj.container:
-            for objec in obj.container.inventory:
-                objec.animation_init()
-    # for obj in PLAYER.container.inventory:
-    #     obj.animation_init()
+    game, player = obj_SaveFile(game_slot_file(slot)).load()
+
+    AUTOSAVE.use_file(game_slot_file(slot))
+    GAME, PLAYER = game, player
 
     map_make_fov(GAME.current_map)
 
 
-def game_continue():
+def game_continue(slot):
+    """ Plays the game saved in slot, a new one if the slot is empty. """
+    if not os.path.exists(game_slot_file(slot)):
+        game_new(slot)
+        return game_main_loop()
+
     try:
-        game_load()
-    except:
-        game_new()
+        game_load(slot)
+    except SAVE_LOAD_ERRORS as error:
+        # leave the file be, a new game would autosave over it
+        return menu_message(["Slot " + str(slot) + " can't be loaded", str(error)]) is not False
 
     return game_main_loop()
 
@@ -2718,7 +5114,21 @@ def preferences_load():
 
 
 if __name__ == '__main__':
-    menu_main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--headless", type=int, metavar="TURNS",
+                        help="simulate TURNS turns without a window and report turns/s")
+    parser.add_argument("--commands", metavar="FILE",
+                        help="read headless commands from FILE instead of wandering randomly")
+    parser.add_argument("--seed", type=int,
+                        help="seed the game's random number generator")
+    parser.add_argument("--renderer", choices=["software", "texture"], default="software",
+                        help="draw with Surface blits or with SDL2 textures")
+    args = parser.parse_args()
+
+    if args.headless:
+        game_headless(args.headless, args.commands, args.seed)
+    else:
+        menu_main(args.renderer)
 
 # End
 #  88888888b 888888ba  888888ba